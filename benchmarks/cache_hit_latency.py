@@ -0,0 +1,75 @@
+"""Latency of a cached GET /api/v1/menus before and after serving raw cached bytes.
+
+"before" replays the old hit path (json.loads, then FastAPI validates and
+re-serializes through response_model), "after" is the current endpoint,
+with and without the in-process L1 cache. Needs the configured Postgres
+and Redis:
+
+    python -m benchmarks.cache_hit_latency --menus 200 --requests 2000
+"""
+import argparse
+import asyncio
+import json
+import statistics
+import time
+
+from asgi_lifespan import LifespanManager
+from fastapi import Depends
+from httpx import AsyncClient
+
+from src.api.v1.schemas import MenuResponse
+from src.db import Redis, get_redis
+from src.main import app
+from src.services import local_cache
+
+LEGACY_KEY = "bench_legacy_menu_list"
+
+
+@app.get("/bench/legacy/menus", response_model=list[MenuResponse], include_in_schema=False)
+async def legacy_menu_list(redis: Redis = Depends(get_redis)) -> list[MenuResponse]:
+    return json.loads(await redis.get(LEGACY_KEY))
+
+
+async def measure(client: AsyncClient, url: str, requests: int) -> tuple[float, float]:
+    latencies = []
+    for _ in range(requests):
+        start = time.perf_counter()
+        response = await client.get(url)
+        latencies.append((time.perf_counter() - start) * 1000)
+        assert response.status_code == 200
+    latencies.sort()
+    return statistics.median(latencies), latencies[int(len(latencies) * 0.99) - 1]
+
+
+async def main(menus: int, requests: int) -> None:
+    async with LifespanManager(app), AsyncClient(app=app, base_url="http://bench") as client:
+        ids = []
+        for i in range(menus):
+            response = await client.post("/api/v1/menus", json={"title": f"bench-{i}", "description": "x" * 64})
+            ids.append(response.json()["id"])
+        try:
+            body = (await client.get("/api/v1/menus")).content
+            await (await get_redis()).set(LEGACY_KEY, body)
+
+            results = {"before": await measure(client, "/bench/legacy/menus", requests)}
+            maxsize, local_cache.maxsize = local_cache.maxsize, 0
+            local_cache.clear()
+            results["after, Redis only"] = await measure(client, "/api/v1/menus", requests)
+            local_cache.maxsize = maxsize
+            results["after, with L1"] = await measure(client, "/api/v1/menus", requests)
+        finally:
+            await (await get_redis()).delete(LEGACY_KEY)
+            for menu_id in ids:
+                await client.delete(f"/api/v1/menus/{menu_id}")
+
+    print(f"GET /api/v1/menus, {menus} menus, {len(body)} bytes, {requests} requests")
+    for name, (p50, p99) in results.items():
+        print(f"{name:<20} p50 {p50:7.3f} ms   p99 {p99:7.3f} ms")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--menus", type=int, default=200)
+    parser.add_argument("--requests", type=int, default=2000)
+    args = parser.parse_args()
+    asyncio.run(main(args.menus, args.requests))
@@ -0,0 +1,86 @@
+"""Seeding speed: one insert_unique (INSERT ... RETURNING + COMMIT) per row vs CatalogLoader.
+
+The per-row path is measured on a smaller catalog, both are reported as
+dishes per second. Needs the configured Postgres:
+
+    python -m benchmarks.catalog_import --dishes 100000 --legacy-dishes 2000
+"""
+import argparse
+import asyncio
+import time
+from itertools import islice
+
+from sqlalchemy import delete
+
+from src.db import async_session
+from src.models import Dish, Menu, SubMenu
+from src.services import CRUD, CatalogLoader
+
+DISHES_PER_SUBMENU = 100
+SUBMENUS_PER_MENU = 10
+
+
+def make_catalog(prefix: str, dishes: int) -> list[dict]:
+    submenus = [
+        {
+            "title": f"{prefix}-submenu-{i}",
+            "description": "x" * 32,
+            "dishes": [
+                {"title": f"{prefix}-dish-{i}-{j}", "description": "x" * 64, "price": "100.00"}
+                for j in range(min(DISHES_PER_SUBMENU, dishes - i * DISHES_PER_SUBMENU))
+            ],
+        }
+        for i in range(-(-dishes // DISHES_PER_SUBMENU))
+    ]
+    remaining = iter(submenus)
+    return [
+        {
+            "title": f"{prefix}-menu-{i}",
+            "description": "x" * 32,
+            "submenus": list(islice(remaining, SUBMENUS_PER_MENU)),
+        }
+        for i in range(-(-len(submenus) // SUBMENUS_PER_MENU))
+    ]
+
+
+async def load_row_by_row(crud: CRUD, catalog: list[dict]) -> None:
+    for menu_data in catalog:
+        menu = await crud.insert_unique(Menu, {"title": menu_data["title"], "description": menu_data["description"]})
+        assert menu is not None
+        for submenu_data in menu_data["submenus"]:
+            values = {"title": submenu_data["title"], "description": submenu_data["description"], "owner": menu["id"]}
+            submenu = await crud.insert_unique(SubMenu, values)
+            assert submenu is not None
+            for dish_data in submenu_data["dishes"]:
+                await crud.insert_unique(Dish, {**dish_data, "owner": submenu["id"]})
+
+
+async def main(dishes: int, legacy_dishes: int) -> None:
+    results = {}
+    for name, prefix, count in (
+        ("insert_unique per row", "bench-legacy", legacy_dishes),
+        ("CatalogLoader", "bench", dishes),
+    ):
+        catalog = make_catalog(prefix, count)
+        async with async_session() as db:
+            crud = CRUD(db)
+            start = time.perf_counter()
+            if prefix == "bench":
+                await CatalogLoader(crud).load(catalog)
+            else:
+                await load_row_by_row(crud, catalog)
+            results[name] = (count, time.perf_counter() - start)
+            query = delete(Menu).where(Menu.title.like(f"{prefix}-menu-%")).execution_options(synchronize_session=False)
+            await db.execute(query)
+            await db.commit()
+
+    for name, (count, seconds) in results.items():
+        print(f"{name:<22} {count:>7} dishes {seconds:8.2f} s {count / seconds:10.0f} dishes/s")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--dishes", type=int, default=100_000)
+    parser.add_argument("--legacy-dishes", type=int, default=2_000)
+    args = parser.parse_args()
+    asyncio.run(main(args.dishes, args.legacy_dishes))
@@ -0,0 +1,64 @@
+"""Throughput of the dev and production engine profiles on a read-heavy load.
+
+Each worker opens a session per request and loads a menu by id through
+CRUD, like a cache miss in the API does. The dev profile echoes every
+statement to stdout, so keep only the summary at the end. Needs the
+configured Postgres:
+
+    python -m benchmarks.engine_profiles --workers 20 --requests 200 | tail -3
+"""
+import argparse
+import asyncio
+import statistics
+import time
+
+from sqlalchemy import delete, insert
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import sessionmaker
+
+from src.core import config
+from src.db import make_engine
+from src.models import Menu
+from src.services import CRUD
+
+
+async def worker(session_factory: sessionmaker, ids: list[int], requests: int, latencies: list[float]) -> None:
+    for i in range(requests):
+        start = time.perf_counter()
+        async with session_factory() as db:
+            assert await CRUD(db).get_from_db_by_id(Menu, ids[i % len(ids)])
+        latencies.append((time.perf_counter() - start) * 1000)
+
+
+async def run_profile(profile: str, workers: int, requests: int) -> tuple[float, float, float]:
+    engine = make_engine(config.DB_ENGINE_PROFILES[profile])
+    session_factory = sessionmaker(engine, expire_on_commit=False, class_=AsyncSession)
+    async with engine.begin() as connection:
+        rows = [{"title": f"bench-engine-{i}", "description": "x" * 64} for i in range(100)]
+        ids = list((await connection.execute(insert(Menu).values(rows).returning(Menu.id))).scalars())
+    try:
+        latencies: list[float] = []
+        start = time.perf_counter()
+        await asyncio.gather(*(worker(session_factory, ids, requests, latencies) for _ in range(workers)))
+        elapsed = time.perf_counter() - start
+    finally:
+        async with engine.begin() as connection:
+            await connection.execute(delete(Menu).where(Menu.id.in_(ids)))
+        await engine.dispose()
+    latencies.sort()
+    return len(latencies) / elapsed, statistics.median(latencies), latencies[int(len(latencies) * 0.99) - 1]
+
+
+async def main(workers: int, requests: int) -> None:
+    results = {profile: await run_profile(profile, workers, requests) for profile in config.DB_ENGINE_PROFILES}
+    print(f"{workers} workers x {requests} requests, load menu by id in a new session")
+    for profile, (rps, p50, p99) in results.items():
+        print(f"{profile:<12} {rps:8.0f} req/s   p50 {p50:7.3f} ms   p99 {p99:7.3f} ms")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--workers", type=int, default=20)
+    parser.add_argument("--requests", type=int, default=200)
+    args = parser.parse_args()
+    asyncio.run(main(args.workers, args.requests))
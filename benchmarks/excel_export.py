@@ -0,0 +1,80 @@
+"""Rows/sec and peak RSS of the Excel export: constant-memory XlsxWriter vs a regular openpyxl workbook.
+
+Rows look like the ones make_excel_file produces (ten columns, ids and
+text). Every run happens in a fresh process, so its peak RSS is its own.
+No database needed:
+
+    python -m benchmarks.excel_export --sizes 10000 100000 1000000
+"""
+import argparse
+import multiprocessing
+import os
+import resource
+import tempfile
+import time
+from collections.abc import Iterator
+
+from openpyxl.workbook import Workbook
+
+from src.tasks.tasks import write_xlsx
+
+
+def make_rows(count: int) -> Iterator[list]:
+    for i in range(count):
+        menu, submenu = i // 1000, i // 50
+        yield [menu, f"Menu {menu}", "menu", submenu, f"Submenu {submenu}", "submenu", i, f"Dish {i}", "dish", "9.50"]
+
+
+def write_openpyxl(path: str, rows: Iterator[list]) -> None:
+    # прежняя реализация create_task: вся таблица в памяти до сохранения
+    workbook = Workbook()
+    worksheet = workbook.active
+    worksheet.title = "Меню"
+    for i, row in enumerate(rows):
+        for j, value in enumerate(row):
+            worksheet.cell(i + 1, j + 1, value)
+    workbook.save(path)
+
+
+def run(writer: str, count: int, queue: multiprocessing.Queue) -> None:
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, "export.xlsx")
+        start = time.perf_counter()
+        if writer == "xlsxwriter":
+            write_xlsx(path, make_rows(count))
+        else:
+            write_openpyxl(path, make_rows(count))
+        elapsed = time.perf_counter() - start
+    # ru_maxrss - в килобайтах на Linux
+    queue.put((count / elapsed, resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024))
+
+
+def measure(writer: str, count: int) -> tuple[float, float]:
+    queue: multiprocessing.Queue = multiprocessing.Queue()
+    process = multiprocessing.Process(target=run, args=(writer, count, queue))
+    process.start()
+    result = queue.get()
+    process.join()
+    return result
+
+
+def main(sizes: list[int], baseline_limit: int) -> None:
+    print(f"{'writer':<12} {'rows':>9} {'rows/s':>10} {'peak RSS':>12}")
+    for count in sizes:
+        writers = ["xlsxwriter"] + (["openpyxl"] if count <= baseline_limit else [])
+        for writer in writers:
+            rows_per_sec, peak_mb = measure(writer, count)
+            print(f"{writer:<12} {count:>9} {rows_per_sec:>10.0f} {peak_mb:>9.1f} MB")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10000, 100000, 1000000])
+    parser.add_argument(
+        "--baseline-limit",
+        type=int,
+        default=100000,
+        help="largest size to run the in-memory openpyxl writer for (it needs gigabytes at 1M rows)",
+    )
+    args = parser.parse_args()
+    main(args.sizes, args.baseline_limit)
@@ -0,0 +1,44 @@
+from fastapi import APIRouter, status
+
+from src.api.v1.schemas import CacheStatsReport, DbEngineStats, RedisPoolStats
+from src.db import get_engine_stats, get_redis_pool
+from src.services import cache_stats
+
+router = APIRouter()
+
+
+@router.get(
+    path="/admin/redis",
+    summary="Статистика пула Redis",
+    tags=["admin"],
+    description="Состояние пула соединений Redis текущего процесса",
+    response_model=RedisPoolStats,
+    status_code=status.HTTP_200_OK,
+)
+async def redis_pool_stats() -> RedisPoolStats:
+    return RedisPoolStats(**get_redis_pool().stats())
+
+
+@router.get(
+    path="/admin/db",
+    summary="Настройки и пул движка БД",
+    tags=["admin"],
+    description="Активный профиль движка БД, его настройки и состояние пула соединений текущего процесса",
+    response_model=DbEngineStats,
+    status_code=status.HTTP_200_OK,
+)
+async def db_engine_stats() -> DbEngineStats:
+    return DbEngineStats(**get_engine_stats())
+
+
+@router.get(
+    path="/admin/cache",
+    summary="Статистика кеша",
+    tags=["admin"],
+    description="Попадания в локальный (L1) кеш и в Redis (L2), промахи, вытеснения и средний "
+    "размер значений по семействам ключей в текущем процессе",
+    response_model=CacheStatsReport,
+    status_code=status.HTTP_200_OK,
+)
+async def cache_stats_report() -> CacheStatsReport:
+    return CacheStatsReport(**cache_stats.report())
@@ -1,12 +1,18 @@
-from fastapi import APIRouter, Depends, status
+from decimal import Decimal
+from typing import Literal
+
+from fastapi import APIRouter, Body, Depends, Header, Query, Response, status
 
 from src.api.v1.schemas import (
-    DishBase,
+    DishBatchResult,
+    DishBatchUpdate,
     DishCreate,
     DishResponse,
+    DishUpdate,
     Response404,
     Response409,
 )
+from src.core import config
 from src.services.dish import DishService, get_dish_service
 
 router = APIRouter()
@@ -16,15 +22,93 @@ router = APIRouter()
     path="/dishes",
     summary="Список блюд",
     tags=["dishes"],
+    description="Получение страницы списка блюд подменю, курсор следующей страницы - в заголовке X-Next-Cursor",
     response_model=list[DishResponse],
     status_code=status.HTTP_200_OK,
 )
 async def dish_list(
+    menu_id: int,
+    submenu_id: int,
+    after_id: str = Query(
+        default="0",
+        regex=r"^[0-9]+$|^([0-9]+(\.[0-9]+)?)?:[0-9]+$",
+        description="Курсор из X-Next-Cursor: id последнего элемента предыдущей страницы, при sort=price - цена:id",
+    ),
+    limit: int = Query(default=config.LIST_PAGE_SIZE, ge=1, le=config.LIST_PAGE_SIZE_MAX),
+    stream: bool = Query(default=False, description="Отдать все элементы после курсора потоком, без кеша"),
+    min_price: Decimal | None = Query(default=None, ge=0, description="Минимальная цена включительно"),
+    max_price: Decimal | None = Query(default=None, ge=0, description="Максимальная цена включительно"),
+    sort: Literal["price"] | None = Query(default=None, description="price - по возрастанию цены, иначе по id"),
+    if_none_match: str | None = Header(default=None),
+    dish_service: DishService = Depends(get_dish_service),
+) -> Response:
+    return await dish_service.get_dish_list(
+        menu_id=menu_id,
+        submenu_id=submenu_id,
+        cursor=after_id,
+        limit=limit,
+        if_none_match=if_none_match,
+        stream=stream,
+        min_price=min_price,
+        max_price=max_price,
+        sort=sort,
+    )
+
+
+@router.post(
+    path="/dishes/batch",
+    summary="Добавить блюда пакетом",
+    tags=["dishes"],
+    description="Добавление блюд одной транзакцией, блюдо с занятым названием пропускается (status conflict)",
+    responses={409: {"model": Response409}},
+    response_model=list[DishBatchResult],
+    status_code=status.HTTP_200_OK,
+)
+async def dish_batch_create(
+    menu_id: int,
+    submenu_id: int,
+    dishes: list[DishCreate] = Body(min_items=1, max_items=config.DISH_BATCH_MAX_SIZE),
+    dish_service: DishService = Depends(get_dish_service),
+) -> list[DishBatchResult]:
+    return await dish_service.create_dishes(menu_id=menu_id, submenu_id=submenu_id, new_dishes=dishes)
+
+
+@router.patch(
+    path="/dishes/batch",
+    summary="Обновить блюда пакетом",
+    tags=["dishes"],
+    description="Обновление блюд подменю одной транзакцией, изменяются только переданные поля",
+    responses={409: {"model": Response409}},
+    response_model=list[DishBatchResult],
+    status_code=status.HTTP_200_OK,
+)
+async def dish_batch_update(
+    menu_id: int,
+    submenu_id: int,
+    dishes: list[DishBatchUpdate] = Body(min_items=1, max_items=config.DISH_BATCH_MAX_SIZE),
     dish_service: DishService = Depends(get_dish_service),
-) -> list[DishResponse]:
-    return await dish_service.get_dish_list()
+) -> list[DishBatchResult]:
+    return await dish_service.update_dishes(menu_id=menu_id, submenu_id=submenu_id, items=dishes)
 
 
+@router.delete(
+    path="/dishes/batch",
+    summary="Удалить блюда пакетом",
+    tags=["dishes"],
+    description="Удаление блюд подменю по списку id одной транзакцией",
+    response_model=list[DishBatchResult],
+    status_code=status.HTTP_200_OK,
+)
+async def dish_batch_delete(
+    menu_id: int,
+    submenu_id: int,
+    dish_ids: list[int] = Body(min_items=1, max_items=config.DISH_BATCH_MAX_SIZE),
+    dish_service: DishService = Depends(get_dish_service),
+) -> list[DishBatchResult]:
+    return await dish_service.delete_dishes(menu_id=menu_id, submenu_id=submenu_id, ids=dish_ids)
+
+
+# объявлены после /dishes/batch, иначе "batch" разбирался бы как dish_id
 @router.get(
     path="/dishes/{dish_id}",
     summary="Просмотр определенного блюда",
@@ -35,10 +119,18 @@ async def dish_list(
     status_code=status.HTTP_200_OK,
 )
 async def dish_detail(
+    menu_id: int,
+    submenu_id: int,
     dish_id: int,
+    if_none_match: str | None = Header(default=None),
     dish_service: DishService = Depends(get_dish_service),
-) -> DishResponse:
-    return await dish_service.get_dish_by_id(dish_id)
+) -> Response:
+    return await dish_service.get_dish_by_id(
+        menu_id=menu_id,
+        submenu_id=submenu_id,
+        dish_id=dish_id,
+        if_none_match=if_none_match,
+    )
 
 
 @router.post(
@@ -67,14 +159,14 @@ async def dish_create(
     path="/dishes/{dish_id}",
     summary="Обновить блюдо",
     tags=["dishes"],
-    description="Обновление заданного блюда",
+    description="Обновление заданного блюда, изменяются только переданные поля",
     responses={404: {"model": Response404}},
     response_model=DishResponse,
     status_code=status.HTTP_200_OK,
 )
 async def dish_update(
     dish_id: int,
-    dish: DishBase,
+    dish: DishUpdate,
     dish_service: DishService = Depends(get_dish_service),
 ) -> DishResponse:
     return await dish_service.update_dish(
@@ -3,7 +3,12 @@ import os.path
 from fastapi import APIRouter, Depends, HTTPException, status
 from fastapi.responses import FileResponse
 
-from src.api.v1.schemas import TaskCreatedResponse
+from src.api.v1.schemas import (
+    CatalogImportResponse,
+    CatalogMenu,
+    Response409,
+    TaskCreatedResponse,
+)
 from src.core import config
 from src.services.full_menu import FullMenu, get_full_menu
 from src.tasks import create_task, get_task_info
@@ -20,9 +25,8 @@ router = APIRouter()
     summary="Создать excel файл",
     description="Добавление задачи на создание excel файла",
 )
-async def get_excel_f(full_menu: FullMenu = Depends(get_full_menu)):
-    data: list = await full_menu.make_excel_file()
-    task_id = create_task.delay(data)
+async def get_excel_f():
+    task_id = create_task.delay()
     return get_task_info(task_id)
 
 
@@ -59,3 +63,19 @@ async def get_task_status(task_id: str):
 )
 async def create_full_menu(full_menu: FullMenu = Depends(get_full_menu)):
     return await full_menu.create_all_menu()
+
+
+@router.post(
+    path="/catalog/import",
+    tags=["fill_database"],
+    status_code=status.HTTP_201_CREATED,
+    response_model=CatalogImportResponse,
+    responses={409: {"model": Response409}},
+    summary="Загрузить каталог",
+    description="Загрузка меню, подменю и блюд одним документом в одной транзакции",
+)
+async def import_catalog(
+    catalog: list[CatalogMenu],
+    full_menu: FullMenu = Depends(get_full_menu),
+) -> dict:
+    return await full_menu.import_catalog(catalog)
@@ -1,12 +1,14 @@
-from fastapi import APIRouter, Depends, status
+from fastapi import APIRouter, Depends, Header, Query, Response, status
 
 from src.api.v1.schemas import (
-    MenuBase,
     MenuCreate,
     MenuResponse,
+    MenuTree,
+    MenuUpdate,
     Response404,
     Response409,
 )
+from src.core import config
 from src.services.menu import MenuService, get_menu_service
 
 router = APIRouter()
@@ -16,16 +18,36 @@ router = APIRouter()
     path="/menus",
     summary="Список меню",
     tags=["menus"],
-    description="Получение списка меню",
+    description="Получение страницы списка меню, курсор следующей страницы - в заголовке X-Next-Cursor",
     response_model=list[MenuResponse],
     status_code=status.HTTP_200_OK,
 )
 async def menu_list(
+    after_id: int = Query(default=0, ge=0, description="Курсор: id последнего элемента предыдущей страницы"),
+    limit: int = Query(default=config.LIST_PAGE_SIZE, ge=1, le=config.LIST_PAGE_SIZE_MAX),
+    stream: bool = Query(default=False, description="Отдать все элементы после курсора потоком, без кеша"),
+    if_none_match: str | None = Header(default=None),
     menu_service: MenuService = Depends(get_menu_service),
-) -> list[MenuResponse]:
-    return await menu_service.get_menu_list()
+) -> Response:
+    return await menu_service.get_menu_list(after_id=after_id, limit=limit, if_none_match=if_none_match, stream=stream)
 
 
+@router.get(
+    path="/menus/tree",
+    summary="Дерево меню",
+    tags=["menus"],
+    description="Все меню с подменю и блюдами одним документом",
+    response_model=list[MenuTree],
+    status_code=status.HTTP_200_OK,
+)
+async def menu_tree(
+    if_none_match: str | None = Header(default=None),
+    menu_service: MenuService = Depends(get_menu_service),
+) -> Response:
+    return await menu_service.get_menu_tree(if_none_match=if_none_match)
+
+
+# объявлен после /menus/tree, иначе "tree" разбирался бы как menu_id
 @router.get(
     path="/menus/{menu_id}",
     summary="Просмотр определенного меню",
@@ -37,9 +59,10 @@ async def menu_list(
 )
 async def menu_detail(
     menu_id: int,
+    if_none_match: str | None = Header(default=None),
     menu_service: MenuService = Depends(get_menu_service),
-) -> MenuResponse:
-    return await menu_service.get_menu_by_id(menu_id=menu_id)
+) -> Response:
+    return await menu_service.get_menu_by_id(menu_id=menu_id, if_none_match=if_none_match)
 
 
 @router.post(
@@ -62,13 +85,13 @@ async def menu_create(
     path="/menus/{menu_id}",
     summary="Обновить меню",
     tags=["menus"],
-    description="Обновление заданного меню",
+    description="Обновление заданного меню, изменяются только переданные поля",
     responses={404: {"model": Response404}},
     response_model=MenuResponse,
     status_code=status.HTTP_200_OK,
 )
 async def menu_update(
-    menu: MenuBase,
+    menu: MenuUpdate,
     menu_id: int,
     menu_service: MenuService = Depends(get_menu_service),
 ) -> MenuResponse:
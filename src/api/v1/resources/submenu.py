@@ -1,12 +1,13 @@
-from fastapi import APIRouter, Depends, status
+from fastapi import APIRouter, Depends, Header, Query, Response, status
 
 from src.api.v1.schemas import (
     Response404,
     Response409,
-    SubMenuBase,
     SubMenuCreate,
     SubMenuResponse,
+    SubMenuUpdate,
 )
+from src.core import config
 from src.services.submenu import SubMenuService, get_submenu_service
 
 router = APIRouter()
@@ -16,14 +17,25 @@ router = APIRouter()
     path="/submenus",
     summary="Список подменю",
     tags=["submenus"],
-    description="Получение списка подменю",
+    description="Получение страницы списка подменю меню, курсор следующей страницы - в заголовке X-Next-Cursor",
     response_model=list[SubMenuResponse],
     status_code=status.HTTP_200_OK,
 )
 async def submenu_list(
+    menu_id: int,
+    after_id: int = Query(default=0, ge=0, description="Курсор: id последнего элемента предыдущей страницы"),
+    limit: int = Query(default=config.LIST_PAGE_SIZE, ge=1, le=config.LIST_PAGE_SIZE_MAX),
+    stream: bool = Query(default=False, description="Отдать все элементы после курсора потоком, без кеша"),
+    if_none_match: str | None = Header(default=None),
     submenu_service: SubMenuService = Depends(get_submenu_service),
-) -> list[SubMenuResponse]:
-    return await submenu_service.get_submenu_list()
+) -> Response:
+    return await submenu_service.get_submenu_list(
+        menu_id=menu_id,
+        after_id=after_id,
+        limit=limit,
+        if_none_match=if_none_match,
+        stream=stream,
+    )
 
 
 @router.get(
@@ -36,10 +48,12 @@ async def submenu_list(
     status_code=status.HTTP_200_OK,
 )
 async def submenu_detail(
+    menu_id: int,
     submenu_id: int,
+    if_none_match: str | None = Header(default=None),
     submenu_service: SubMenuService = Depends(get_submenu_service),
-) -> SubMenuResponse:
-    return await submenu_service.get_submenu_by_id(submenu_id=submenu_id)
+) -> Response:
+    return await submenu_service.get_submenu_by_id(menu_id=menu_id, submenu_id=submenu_id, if_none_match=if_none_match)
 
 
 @router.post(
@@ -63,14 +77,14 @@ async def submenu_create(
     path="/submenus/{submenu_id}",
     summary="Обновить подменю",
     tags=["submenus"],
-    description="Обновление заданного подменю",
+    description="Обновление заданного подменю, изменяются только переданные поля",
     responses={404: {"model": Response404}},
     response_model=SubMenuResponse,
     status_code=status.HTTP_200_OK,
 )
 async def submenu_update(
     submenu_id: int,
-    sub_menu: SubMenuBase,
+    sub_menu: SubMenuUpdate,
     submenu_service: SubMenuService = Depends(get_submenu_service),
 ) -> SubMenuResponse:
     return await submenu_service.update_submenu(submenu_id, sub_menu)
@@ -1,4 +1,7 @@
+from .admin import *
+from .catalog import *
 from .dish import *
 from .menu import *
-from .submenu import *
 from .responses import *
+from .submenu import *
+from .tree import *
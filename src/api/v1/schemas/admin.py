@@ -0,0 +1,43 @@
+from pydantic import BaseModel
+
+__all__ = ("CacheFamilyStats", "CacheStatsReport", "DbEngineStats", "RedisPoolStats")
+
+
+class RedisPoolStats(BaseModel):
+    max_connections: int
+    created: int
+    in_use: int
+    idle: int
+    acquired: int
+    wait_time_avg_ms: float
+    wait_time_max_ms: float
+
+
+class DbEngineStats(BaseModel):
+    profile: str
+    settings: dict
+    pool_size: int
+    checked_in: int
+    checked_out: int
+    overflow: int
+
+
+class CacheFamilyStats(BaseModel):
+    ttl: int
+    hits: int
+    misses: int
+    hit_ratio: float
+    evictions: int
+    avg_payload_bytes: float
+
+
+class CacheStatsReport(BaseModel):
+    lookups: int
+    l1_hits: int
+    l2_hits: int
+    misses: int
+    l1_hit_ratio: float
+    l2_hit_ratio: float
+    l1_size: int
+    l1_evictions: int
+    families: dict[str, CacheFamilyStats]
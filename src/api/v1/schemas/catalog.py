@@ -0,0 +1,32 @@
+from pydantic import BaseModel
+
+from .dish import DishCreate
+from .menu import MenuBase
+from .submenu import SubMenuBase
+
+__all__ = (
+    "CatalogDish",
+    "CatalogImportResponse",
+    "CatalogMenu",
+    "CatalogSubMenu",
+)
+
+
+class CatalogDish(DishCreate):
+    ...
+
+
+class CatalogSubMenu(SubMenuBase):
+    dishes: list[CatalogDish] = []
+
+
+class CatalogMenu(MenuBase):
+    submenus: list[CatalogSubMenu] = []
+
+
+class CatalogImportResponse(BaseModel):
+    menus: int
+    submenus: int
+    dishes: int
+    seconds: float
+    cache_warmup: dict
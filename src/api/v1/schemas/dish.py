@@ -1,21 +1,63 @@
-from pydantic import BaseModel
+from decimal import ROUND_DOWN, Decimal
+
+from pydantic import BaseModel, Field, validator
 
 __all__ = (
     "DishBase",
+    "DishBatchResult",
+    "DishBatchUpdate",
     "DishCreate",
     "DishResponse",
+    "DishUpdate",
 )
 
+# цена хранится как NUMERIC(12, 2)
+PRICE_QUANT = Decimal("0.01")
+PRICE_MAX = Decimal(10**10)
+
+
+def cut_price(value: Decimal | None) -> Decimal | None:
+    # лишние знаки отбрасываются, а не округляются: 12.555 -> 12.55
+    return None if value is None else value.quantize(PRICE_QUANT, rounding=ROUND_DOWN)
+
+
+def format_price(value: Decimal | str | None) -> str | None:
+    # в API цена - строка с двумя знаками после точки
+    return None if value is None else f"{cut_price(Decimal(value)):.2f}"
+
 
 class DishBase(BaseModel):
     title: str
     description: str
-    price: str
 
 
 class DishCreate(DishBase):
-    ...
+    price: Decimal = Field(ge=0, lt=PRICE_MAX)
+
+    _cut_price = validator("price", allow_reuse=True)(cut_price)
+
+
+class DishUpdate(BaseModel):
+    # PATCH: записываются только переданные поля
+    title: str | None = None
+    description: str | None = None
+    price: Decimal | None = Field(None, ge=0, lt=PRICE_MAX)
+
+    _cut_price = validator("price", allow_reuse=True)(cut_price)
 
 
 class DishResponse(DishBase):
+    price: str | None
     id: str
+
+    _format_price = validator("price", pre=True, allow_reuse=True)(format_price)
+
+
+class DishBatchUpdate(DishUpdate):
+    id: int
+
+
+class DishBatchResult(BaseModel):
+    # created, updated, deleted, conflict (название уже занято) или not_found
+    status: str
+    id: str | None = None
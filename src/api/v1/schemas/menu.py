@@ -4,6 +4,7 @@ __all__ = (
     "MenuBase",
     "MenuCreate",
     "MenuResponse",
+    "MenuUpdate",
 )
 
 
@@ -17,6 +18,12 @@ class MenuCreate(MenuBase):
     dishes_count: int = 0
 
 
+class MenuUpdate(BaseModel):
+    # PATCH: записываются только переданные поля
+    title: str | None = None
+    description: str | None = None
+
+
 class MenuResponse(MenuBase):
     id: str
     submenus_count: int
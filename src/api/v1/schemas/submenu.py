@@ -4,6 +4,7 @@ __all__ = (
     "SubMenuBase",
     "SubMenuCreate",
     "SubMenuResponse",
+    "SubMenuUpdate",
 )
 
 
@@ -16,6 +17,12 @@ class SubMenuCreate(SubMenuBase):
     dishes_count: int = 0
 
 
+class SubMenuUpdate(BaseModel):
+    # PATCH: записываются только переданные поля
+    title: str | None = None
+    description: str | None = None
+
+
 class SubMenuResponse(SubMenuBase):
     id: str
     dishes_count: int = 0
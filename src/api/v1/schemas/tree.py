@@ -0,0 +1,16 @@
+from .dish import DishResponse
+from .menu import MenuResponse
+from .submenu import SubMenuResponse
+
+__all__ = (
+    "MenuTree",
+    "SubMenuTree",
+)
+
+
+class SubMenuTree(SubMenuResponse):
+    dishes: list[DishResponse] = []
+
+
+class MenuTree(MenuResponse):
+    submenus: list[SubMenuTree] = []
@@ -1,14 +1,67 @@
-from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine
+import asyncio
+import logging
+import time
+
+from fastapi import Request
+from sqlalchemy.exc import DBAPIError
+from sqlalchemy.ext.asyncio import AsyncEngine, AsyncSession, create_async_engine
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker
 
 from src.core import config
 
-engine = create_async_engine(
-    config.DATABASE_URL,
-    future=True,
-    echo=True,
-)
+from .redis_db import get_redis
+
+logger = logging.getLogger(__name__)
+
+
+# методы, запросы которых только читают данные и могут идти в реплику
+READ_METHODS = ("GET", "HEAD")
+STICKY_PREFIX = "rw:"
+
+
+def make_engine(settings: dict, url: str = config.DATABASE_URL, **connect_args) -> AsyncEngine:
+    """Create the engine from a profile of config.DB_ENGINE_PROFILES."""
+    return create_async_engine(
+        url,
+        future=True,
+        echo=settings["echo"],
+        pool_size=settings["pool_size"],
+        max_overflow=settings["max_overflow"],
+        pool_timeout=settings["pool_timeout"],
+        pool_pre_ping=settings["pool_pre_ping"],
+        pool_recycle=settings["pool_recycle"],
+        connect_args={
+            # кеш подготовленных запросов на соединение (адаптер SQLAlchemy готовит каждый запрос сам)
+            "prepared_statement_cache_size": settings["statement_cache_size"],
+            "command_timeout": settings["command_timeout"],
+            **connect_args,
+        },
+    )
+
+
+def log_engine_settings() -> None:
+    # у логгеров приложения нет обработчиков, uvicorn выводит INFO только своих логгеров
+    logging.getLogger("uvicorn.error").info(
+        "Database engine profile %r: %s",
+        config.DB_ENGINE_PROFILE,
+        config.DB_ENGINE_SETTINGS,
+    )
+
+
+def get_engine_stats() -> dict:
+    pool = engine.pool
+    return {
+        "profile": config.DB_ENGINE_PROFILE,
+        "settings": config.DB_ENGINE_SETTINGS,
+        "pool_size": pool.size(),
+        "checked_in": pool.checkedin(),
+        "checked_out": pool.checkedout(),
+        "overflow": pool.overflow(),
+    }
+
+
+engine = make_engine(config.DB_ENGINE_SETTINGS)
 
 async_session = sessionmaker(
     engine,
@@ -16,9 +69,75 @@ async_session = sessionmaker(
     class_=AsyncSession,
 )
 
+replica_session: sessionmaker | None = None
+if config.REPLICA_DATABASE_URL:
+    replica_session = sessionmaker(
+        make_engine(config.DB_ENGINE_SETTINGS, config.REPLICA_DATABASE_URL, timeout=config.DB_REPLICA_CONNECT_TIMEOUT),
+        expire_on_commit=False,
+        class_=AsyncSession,
+    )
+# до этого момента (time.monotonic()) реплика считается недоступной
+_replica_down_until: float = 0.0
+
 Base = declarative_base()
 
 
-async def get_db():
+def sticky_key(request: Request) -> str:
+    client = request.client.host if request.client else "unknown"
+    return f"{STICKY_PREFIX}{client}"
+
+
+async def get_db(request: Request):
+    if replica_session is not None and request.method not in READ_METHODS:
+        # после записи клиент какое-то время читает из основной БД, пока реплика не догонит
+        redis = await get_redis()
+        await redis.set(sticky_key(request), 1, ex=config.DB_READ_YOUR_WRITES_SEC)
     async with async_session() as db:
         yield db
+
+
+class ReplicaReader:
+    """Replica session of one read-only request, opened on first use."""
+
+    def __init__(self, request: Request):
+        self.request = request
+        self.db: AsyncSession | None = None
+        self.checked = False
+
+    async def session(self) -> AsyncSession | None:
+        """The replica session, None when reads have to go to the primary."""
+        global _replica_down_until
+        if self.checked:
+            return self.db
+        self.checked = True
+        if replica_session is None or time.monotonic() < _replica_down_until:
+            return None
+        redis = await get_redis()
+        if await redis.exists(sticky_key(self.request)):
+            return None
+        db = replica_session()
+        try:
+            await db.connection()
+        except (OSError, DBAPIError, asyncio.TimeoutError):
+            logger.warning("Read replica is unavailable, reading from the primary", exc_info=True)
+            _replica_down_until = time.monotonic() + config.DB_REPLICA_RETRY_SEC
+            await db.close()
+            return None
+        self.db = db
+        return db
+
+    async def close(self) -> None:
+        if self.db is not None:
+            await self.db.close()
+
+
+async def get_read_db(request: Request):
+    """Lazy replica for read-only requests, None when they always go to the primary."""
+    if replica_session is None or request.method not in READ_METHODS:
+        yield None
+        return
+    reader = ReplicaReader(request)
+    try:
+        yield reader
+    finally:
+        await reader.close()
@@ -1,14 +1,87 @@
-import aioredis
-from aioredis import Redis
+import time
+
+from aioredis import BlockingConnectionPool, Redis
 
 from src.core import config
 
+__all__ = (
+    "Redis",
+    "StatsConnectionPool",
+    "close_redis",
+    "get_redis",
+    "get_redis_pool",
+    "init_redis",
+)
+
+
+class StatsConnectionPool(BlockingConnectionPool):
+    """Blocking pool that also records how long callers wait for a connection."""
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.acquired: int = 0
+        self.wait_time_total: float = 0.0
+        self.wait_time_max: float = 0.0
+
+    async def get_connection(self, command_name, *keys, **options):
+        start = time.perf_counter()
+        connection = await super().get_connection(command_name, *keys, **options)
+        waited = time.perf_counter() - start
+        self.acquired += 1
+        self.wait_time_total += waited
+        self.wait_time_max = max(self.wait_time_max, waited)
+        return connection
+
+    def stats(self) -> dict:
+        # every slot of the queue is either an idle connection or a placeholder,
+        # so the slots missing from the queue are the connections in use
+        in_use = self.max_connections - self.pool.qsize()
+        created = len(self._connections)
+        return {
+            "max_connections": self.max_connections,
+            "created": created,
+            "in_use": in_use,
+            "idle": created - in_use,
+            "acquired": self.acquired,
+            "wait_time_avg_ms": self.wait_time_total / self.acquired * 1000 if self.acquired else 0.0,
+            "wait_time_max_ms": self.wait_time_max * 1000,
+        }
+
+
+_pool: StatsConnectionPool | None = None
+_redis: Redis | None = None
+
+
+def get_redis_pool() -> StatsConnectionPool:
+    global _pool
+    if _pool is None:
+        _pool = StatsConnectionPool.from_url(
+            url=f"redis://{config.REDIS_HOST}:{config.REDIS_PORT}/0",
+            max_connections=config.REDIS_MAX_CONNECTIONS,
+            timeout=config.REDIS_POOL_TIMEOUT,
+            socket_timeout=config.REDIS_SOCKET_TIMEOUT,
+            socket_connect_timeout=config.REDIS_SOCKET_CONNECT_TIMEOUT,
+            encoding="utf8",
+            decode_responses=False,
+        )
+    return _pool
+
 
 async def get_redis() -> Redis:
-    redis: Redis = aioredis.from_url(
-        url=f"redis://{config.REDIS_HOST}:{config.REDIS_PORT}/0",
-        max_connections=10,
-        encoding="utf8",
-        decode_responses=True,
-    )
-    return redis
+    global _redis
+    if _redis is None:
+        _redis = Redis(connection_pool=get_redis_pool())
+    return _redis
+
+
+async def init_redis() -> None:
+    redis: Redis = await get_redis()
+    await redis.ping()
+
+
+async def close_redis() -> None:
+    global _pool, _redis
+    if _pool is not None:
+        await _pool.disconnect()
+    _pool = None
+    _redis = None
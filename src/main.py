@@ -1,8 +1,14 @@
 import uvicorn
 from fastapi import FastAPI, status
 
-from src.api.v1.resources import dish, full_menu, menu, submenu
+from src.api.v1.resources import admin, dish, full_menu, menu, submenu
 from src.core import config
+from src.db import close_redis, init_redis, log_engine_settings
+from src.services import (
+    start_invalidation_listener,
+    stop_invalidation_listener,
+    warm_up_cache_on_startup,
+)
 
 app = FastAPI(
     title=config.PROJECT_NAME,
@@ -12,6 +18,21 @@ app = FastAPI(
 )
 
 
+@app.on_event("startup")
+async def startup() -> None:
+    log_engine_settings()
+    await init_redis()
+    await start_invalidation_listener()
+    if config.CACHE_WARMUP_ON_STARTUP:
+        await warm_up_cache_on_startup()
+
+
+@app.on_event("shutdown")
+async def shutdown() -> None:
+    await stop_invalidation_listener()
+    await close_redis()
+
+
 @app.get(
     path="/",
     summary="root",
@@ -30,6 +51,7 @@ app.include_router(
     prefix="/api/v1/menus/{menu_id}/submenus/{submenu_id}",
 )
 app.include_router(router=full_menu.router, prefix="/api/v1")
+app.include_router(router=admin.router, prefix="/api/v1")
 
 if __name__ == "__main__":
     uvicorn.run(
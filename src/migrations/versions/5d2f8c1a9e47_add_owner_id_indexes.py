@@ -0,0 +1,37 @@
+"""add (owner, id) indexes
+
+Revision ID: 5d2f8c1a9e47
+Revises: 4b029583e7a2
+Create Date: 2026-10-18 12:00:00.000000
+
+"""
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision = "5d2f8c1a9e47"
+down_revision = "4b029583e7a2"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    # CONCURRENTLY не блокирует запись в таблицы, но не может выполняться внутри транзакции
+    with op.get_context().autocommit_block():
+        op.create_index(
+            "ix_submenu_owner_id",
+            "submenu",
+            ["owner", "id"],
+            postgresql_concurrently=True,
+        )
+        op.create_index(
+            "ix_dish_owner_id",
+            "dish",
+            ["owner", "id"],
+            postgresql_concurrently=True,
+        )
+
+
+def downgrade() -> None:
+    with op.get_context().autocommit_block():
+        op.drop_index("ix_dish_owner_id", table_name="dish", postgresql_concurrently=True)
+        op.drop_index("ix_submenu_owner_id", table_name="submenu", postgresql_concurrently=True)
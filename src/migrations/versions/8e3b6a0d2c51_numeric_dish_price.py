@@ -0,0 +1,70 @@
+"""numeric dish price
+
+Revision ID: 8e3b6a0d2c51
+Revises: 5d2f8c1a9e47
+Create Date: 2026-10-18 15:00:00.000000
+
+"""
+import sqlalchemy as sa
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision = "8e3b6a0d2c51"
+down_revision = "5d2f8c1a9e47"
+branch_labels = None
+depends_on = None
+
+# строк в одной транзакции заполнения, чтобы не держать блокировки на всей таблице
+BATCH_SIZE = 10000
+# строки, которые не разбираются как число, получают NULL; лишние знаки отбрасываются, как в API
+TO_NUMERIC = r"CASE WHEN {price} ~ '^\s*[0-9]+(\.[0-9]*)?\s*$' THEN trunc({price}::numeric, 2) END"
+
+
+def upgrade() -> None:
+    op.add_column("dish", sa.Column("price_numeric", sa.Numeric(12, 2), nullable=True))
+    # записи во время заполнения сразу получают новую цену, и строки, обновленные после своего пакета, не отстают
+    op.execute(
+        f"""
+        CREATE FUNCTION dish_price_numeric_sync() RETURNS trigger AS $$
+        BEGIN
+            NEW.price_numeric := {TO_NUMERIC.format(price="NEW.price")};
+            RETURN NEW;
+        END
+        $$ LANGUAGE plpgsql
+        """,
+    )
+    op.execute(
+        "CREATE TRIGGER dish_price_numeric_sync BEFORE INSERT OR UPDATE OF price ON dish "
+        "FOR EACH ROW EXECUTE FUNCTION dish_price_numeric_sync()",
+    )
+    connection = op.get_bind()
+    with op.get_context().autocommit_block():
+        # каждый пакет - отдельная транзакция
+        last_id = connection.execute(sa.text("SELECT coalesce(max(id), 0) FROM dish")).scalar()
+        for start in range(0, last_id, BATCH_SIZE):
+            connection.execute(
+                sa.text(
+                    f"UPDATE dish SET price_numeric = {TO_NUMERIC.format(price='price')} "
+                    "WHERE id > :start AND id <= :end",
+                ),
+                {"start": start, "end": start + BATCH_SIZE},
+            )
+    # блокировка сразу на всю замену колонки, чтобы не повышать ее по ходу
+    op.execute("LOCK TABLE dish IN ACCESS EXCLUSIVE MODE")
+    op.execute("DROP TRIGGER dish_price_numeric_sync ON dish")
+    op.execute("DROP FUNCTION dish_price_numeric_sync()")
+    op.drop_column("dish", "price")
+    op.alter_column("dish", "price_numeric", new_column_name="price")
+    with op.get_context().autocommit_block():
+        op.create_index(
+            "ix_dish_owner_price_id",
+            "dish",
+            ["owner", "price", "id"],
+            postgresql_concurrently=True,
+        )
+
+
+def downgrade() -> None:
+    with op.get_context().autocommit_block():
+        op.drop_index("ix_dish_owner_price_id", table_name="dish", postgresql_concurrently=True)
+    op.alter_column("dish", "price", type_=sa.String(), postgresql_using="price::text")
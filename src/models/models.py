@@ -1,4 +1,4 @@
-from sqlalchemy import Column, ForeignKey, Integer, String
+from sqlalchemy import Column, ForeignKey, Index, Integer, Numeric, String
 from sqlalchemy.orm import relationship
 
 from src.db import Base
@@ -20,6 +20,8 @@ class Menu(Base):
 
 class SubMenu(Base):
     __tablename__ = "submenu"
+    # выборка подменю меню по порядку id (см. миграцию 5d2f8c1a9e47)
+    __table_args__ = (Index("ix_submenu_owner_id", "owner", "id"),)
 
     id = Column(Integer, primary_key=True, index=True)
     title = Column(String, unique=True, index=True)
@@ -35,11 +37,16 @@ class SubMenu(Base):
 
 class Dish(Base):
     __tablename__ = "dish"
+    __table_args__ = (
+        Index("ix_dish_owner_id", "owner", "id"),
+        # фильтр по диапазону цен и сортировка по цене внутри подменю
+        Index("ix_dish_owner_price_id", "owner", "price", "id"),
+    )
 
     id = Column(Integer, primary_key=True, index=True)
     title = Column(String, unique=True, index=True)
     description = Column(String)
-    price = Column(String)
+    price = Column(Numeric(12, 2))
 
     owner = Column(Integer, ForeignKey("submenu.id", ondelete="CASCADE"))
 
@@ -1,2 +1,5 @@
+from .cache_utils import *
+from .cache_warmup import *
+from .catalog import *
 from .crud_utils import *
 from .full_menu import *
@@ -0,0 +1,673 @@
+import asyncio
+import hashlib
+import json
+import logging
+import math
+import random
+import time
+import uuid
+import zlib
+from collections import OrderedDict, defaultdict
+from collections.abc import AsyncIterator, Awaitable, Callable
+from dataclasses import dataclass, field
+from typing import Any, NamedTuple, Union
+
+import orjson
+from aioredis.exceptions import NoScriptError, WatchError
+from fastapi import Depends, HTTPException, Response, status
+from pydantic import BaseModel
+
+from src.core import config
+from src.db import Redis, get_redis
+
+__all__ = (
+    "Cache",
+    "CachePolicy",
+    "CacheStats",
+    "CacheWriter",
+    "CachedValue",
+    "LRUCache",
+    "Loaded",
+    "RawJSONResponse",
+    "cache_policy",
+    "cache_stats",
+    "get_cache",
+    "local_cache",
+    "negative_key",
+    "page_key",
+    "render",
+    "render_page",
+    "render_stream",
+    "start_invalidation_listener",
+    "stop_invalidation_listener",
+)
+
+logger = logging.getLogger(__name__)
+
+
+class LRUCache:
+    """Bounded in-process cache, every entry also expires after its own ttl."""
+
+    def __init__(self, maxsize: int, ttl: float):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.evictions: int = 0
+        self._data: OrderedDict[str, tuple[float, Any]] = OrderedDict()
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+    def get(self, key: str) -> Any | None:
+        item = self._data.get(key)
+        if item is None:
+            return None
+        expires_at, value = item
+        if expires_at <= time.monotonic():
+            del self._data[key]
+            return None
+        self._data.move_to_end(key)
+        return value
+
+    def set(self, key: str, value: Any, ttl: float | None = None) -> None:
+        ttl = self.ttl if ttl is None else min(ttl, self.ttl)
+        self._data[key] = (time.monotonic() + ttl, value)
+        self._data.move_to_end(key)
+        while len(self._data) > self.maxsize:
+            self._data.popitem(last=False)
+            self.evictions += 1
+
+    def pop(self, *keys: str) -> None:
+        for key in keys:
+            self._data.pop(key, None)
+
+    def clear(self) -> None:
+        self._data.clear()
+
+
+class CachePolicy:
+    """TTL of every key family, with jitter so that keys filled together do not expire together."""
+
+    DETAIL = "detail"
+    LIST = "list"
+    NEGATIVE = "negative"
+    EXPORT = "export"
+
+    def __init__(self, ttls: dict[str, int], jitter: float):
+        self.ttls = ttls
+        self.jitter = jitter
+
+    @classmethod
+    def family(cls, key: str) -> str:
+        if key.startswith(NEGATIVE_PREFIX):
+            return cls.NEGATIVE
+        if key.startswith("export"):
+            return cls.EXPORT
+        if "_list" in key:
+            return cls.LIST
+        return cls.DETAIL
+
+    def ttl(self, key: str) -> int:
+        base = self.ttls[self.family(key)]
+        return max(1, round(base * (1 + random.uniform(-self.jitter, self.jitter))))
+
+
+@dataclass
+class FamilyStats:
+    hits: int = 0
+    misses: int = 0
+    evictions: int = 0
+    writes: int = 0
+    bytes_written: int = 0
+
+
+@dataclass
+class CacheStats:
+    l1_hits: int = 0
+    l2_hits: int = 0
+    misses: int = 0
+    families: defaultdict[str, FamilyStats] = field(default_factory=lambda: defaultdict(FamilyStats))
+
+    def hit(self, key: str, l1: bool) -> None:
+        if l1:
+            self.l1_hits += 1
+        else:
+            self.l2_hits += 1
+        self.families[CachePolicy.family(key)].hits += 1
+
+    def miss(self, key: str) -> None:
+        self.misses += 1
+        self.families[CachePolicy.family(key)].misses += 1
+
+    def written(self, key: str, size: int) -> None:
+        family = self.families[CachePolicy.family(key)]
+        family.writes += 1
+        family.bytes_written += size
+
+    def evicted(self, keys: list[str]) -> None:
+        for key in keys:
+            if not key.startswith(TAG_PREFIX):
+                self.families[CachePolicy.family(key)].evictions += 1
+
+    def report(self) -> dict:
+        lookups = self.l1_hits + self.l2_hits + self.misses
+        l2_lookups = self.l2_hits + self.misses
+        return {
+            "lookups": lookups,
+            "l1_hits": self.l1_hits,
+            "l2_hits": self.l2_hits,
+            "misses": self.misses,
+            "l1_hit_ratio": self.l1_hits / lookups if lookups else 0.0,
+            "l2_hit_ratio": self.l2_hits / l2_lookups if l2_lookups else 0.0,
+            "l1_size": len(local_cache),
+            "l1_evictions": local_cache.evictions,
+            "families": {
+                name: {
+                    "ttl": cache_policy.ttls[name],
+                    "hits": family.hits,
+                    "misses": family.misses,
+                    "hit_ratio": family.hits / (family.hits + family.misses) if family.hits + family.misses else 0.0,
+                    "evictions": family.evictions,
+                    "avg_payload_bytes": family.bytes_written / family.writes if family.writes else 0.0,
+                }
+                for name, family in self.families.items()
+            },
+        }
+
+
+cache_policy = CachePolicy(
+    ttls={
+        CachePolicy.DETAIL: config.CACHE_TTL_DETAIL,
+        CachePolicy.LIST: config.CACHE_TTL_LIST,
+        CachePolicy.NEGATIVE: config.CACHE_TTL_NEGATIVE,
+        CachePolicy.EXPORT: config.CACHE_TTL_EXPORT,
+    },
+    jitter=config.CACHE_TTL_JITTER,
+)
+local_cache = LRUCache(maxsize=config.L1_CACHE_MAXSIZE, ttl=config.L1_CACHE_TTL)
+cache_stats = CacheStats()
+# сколько секунд в последний раз пересчитывался ключ, нужно для раннего обновления
+recompute_times = LRUCache(maxsize=config.L1_CACHE_MAXSIZE, ttl=config.CACHE_TAG_EXPIRE_IN_SEC)
+# пересчеты, которые сейчас выполняются в этом процессе
+_inflight: dict[str, asyncio.Future] = {}
+
+TAG_PREFIX = "tag:"
+LOCK_PREFIX = "lock:"
+VERSION_PREFIX = "ver:"
+HEADERS_MARK = b"\x00"
+NEXT_CURSOR_HEADER = "X-Next-Cursor"
+NEGATIVE_PREFIX = "neg:"
+# версия всего каталога, растет при каждой инвалидации; ею помечаются ключи выгрузок ("export...")
+CATALOG_VERSION_KEY = "catalog_version"
+# первый байт zlib-потока, JSON с него начинаться не может
+ZLIB_HEADER = b"\x78"
+
+RELEASE_LOCK_SCRIPT = """
+if redis.call('GET', KEYS[1]) == ARGV[1] then
+    return redis.call('DEL', KEYS[1])
+end
+return 0
+"""
+
+# KEYS - сначала ключи для удаления, затем множества тегов; ARGV[1] - канал, ARGV[2] - число ключей.
+# Удаляет ключи и всё, что помечено тегами, увеличивает их счетчики версий
+# и рассылает список удаленных ключей одним запросом.
+INVALIDATE_SCRIPT = """
+local deleted = {}
+local n_keys = tonumber(ARGV[2])
+for i = 1, n_keys do
+    deleted[#deleted + 1] = KEYS[i]
+end
+for i = n_keys + 1, #KEYS do
+    for _, member in ipairs(redis.call('SMEMBERS', KEYS[i])) do
+        deleted[#deleted + 1] = member
+    end
+    deleted[#deleted + 1] = KEYS[i]
+end
+local evicted = {}
+for _, key in ipairs(deleted) do
+    if redis.call('DEL', key) == 1 then
+        evicted[#evicted + 1] = key
+    end
+end
+for _, key in ipairs(deleted) do
+    if redis.call('EXISTS', 'ver:' .. key) == 1 then
+        redis.call('INCR', 'ver:' .. key)
+    end
+end
+if #deleted > 0 then
+    redis.call('PUBLISH', ARGV[1], cjson.encode(deleted))
+end
+return {deleted, evicted}
+"""
+INVALIDATE_SCRIPT_SHA = hashlib.sha1(INVALIDATE_SCRIPT.encode()).hexdigest()
+
+
+class RawJSONResponse(Response):
+    media_type = "application/json"
+
+
+class CachedValue(NamedTuple):
+    # None, если у клиента уже есть актуальная версия (см. If-None-Match)
+    body: bytes | None
+    # None - значение не попало в кеш (каталог изменился во время загрузки), ETag не отдается
+    version: int | None
+    # заголовки, которые отдаются вместе с телом (например, курсор следующей страницы)
+    headers: dict[str, str] | None = None
+
+    @property
+    def etag(self) -> str:
+        return f'"{self.version}"'
+
+
+def _pydantic_default(obj: Any) -> Any:
+    if isinstance(obj, BaseModel):
+        return obj.dict()
+    raise TypeError
+
+
+def render(data: Any) -> bytes:
+    """Serialize a response (pydantic models included) into the bytes that are cached and sent."""
+    return orjson.dumps(data, default=_pydantic_default)
+
+
+class Loaded(NamedTuple):
+    """Result of a load that also knows tags of its own, e.g. the real owner of the loaded row."""
+
+    body: bytes
+    tags: tuple[str, ...] = ()
+    headers: dict[str, str] | None = None
+
+
+# тело, возвращаемое load, - с заголовками ответа или без них, либо Loaded
+Payload = Union[bytes, tuple[bytes, dict[str, str]], Loaded]
+
+
+def page_key(list_key: str, after_id: int, limit: int, **params: Any) -> str:
+    # параметры со значением None (не заданные в запросе) в ключ не попадают
+    filters = "".join(f":{name}={value}" for name, value in sorted(params.items()) if value is not None)
+    return f"{list_key}:{after_id}:{limit}{filters}"
+
+
+def render_page(items: list, limit: int, sort_key: str | None = None) -> tuple[bytes, dict[str, str]]:
+    """Render one keyset page, items holds up to limit + 1 rows (the extra one only signals a next page)."""
+    if len(items) <= limit:
+        return render(items), {}
+    last = items[limit - 1]
+    # при сортировке не по id курсор - "значение:id", пустое значение - NULL
+    cursor = str(last.id) if sort_key is None else f"{getattr(last, sort_key) or ''}:{last.id}"
+    return render(items[:limit]), {NEXT_CURSOR_HEADER: cursor}
+
+
+def _pack(body: bytes, headers: dict[str, str] | None) -> bytes:
+    # заголовки хранятся перед телом: \0<json>\0<body>; JSON тела никогда не начинается с \0
+    if not headers:
+        return body
+    return HEADERS_MARK + orjson.dumps(headers) + HEADERS_MARK + body
+
+
+def _unpack(payload: bytes) -> tuple[bytes, dict[str, str] | None]:
+    if payload[:1] != HEADERS_MARK:
+        return payload, None
+    end = payload.index(HEADERS_MARK, 1)
+    start = end + 1
+    return payload[start:], orjson.loads(payload[1:end])
+
+
+async def render_stream(items: AsyncIterator[BaseModel], chunk_size: int = 100) -> AsyncIterator[bytes]:
+    """Serialize items into a JSON array chunk by chunk, without holding the whole list."""
+    yield b"["
+    chunk: list[bytes] = []
+    first = True
+    async for item in items:
+        chunk.append(render(item))
+        if len(chunk) >= chunk_size:
+            yield (b"" if first else b",") + b",".join(chunk)
+            chunk, first = [], False
+    if chunk:
+        yield (b"" if first else b",") + b",".join(chunk)
+    yield b"]"
+
+
+def _compress(value: bytes) -> bytes:
+    if config.CACHE_COMPRESS_MIN_SIZE and len(value) >= config.CACHE_COMPRESS_MIN_SIZE:
+        return zlib.compress(value, 1)
+    return value
+
+
+def _decompress(payload: bytes) -> bytes:
+    return zlib.decompress(payload) if payload[:1] == ZLIB_HEADER else payload
+
+
+def negative_key(key: str) -> str:
+    """Key under which a 404 for the given key is remembered."""
+    return NEGATIVE_PREFIX + key
+
+
+def _not_found(detail: bytes | str) -> HTTPException:
+    if isinstance(detail, bytes):
+        detail = detail.decode()
+    return HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail=detail)
+
+
+def _etag_matches(version: int | bytes | None, if_none_match: str | None) -> bool:
+    if version is None or not if_none_match:
+        return False
+    etags = {etag.strip().removeprefix("W/") for etag in if_none_match.split(",")}
+    return "*" in etags or f'"{int(version)}"' in etags
+
+
+@dataclass(frozen=True)
+class Cache:
+    """Redis (L2) with a per-process LRU (L1) in front of it, values are final response bodies."""
+
+    # у ключа есть счетчик "ver:<key>", из него ETag; сброс идет по тегам и рассылается воркерам через pub/sub
+    redis: Redis
+    local: LRUCache = field(default=local_cache)
+
+    async def get(self, key: str) -> bytes | None:
+        if (cached := self.local.get(key)) is not None:
+            cache_stats.hit(key, l1=True)
+            return cached.body
+        if (payload := await self.redis.get(key)) is not None:
+            cache_stats.hit(key, l1=False)
+            return _unpack(_decompress(payload))[0]
+        cache_stats.miss(key)
+        return None
+
+    async def respond(
+        self,
+        key: str,
+        load: Callable[[], Awaitable[Payload]],
+        tags: tuple[str, ...] = (),
+        if_none_match: str | None = None,
+    ) -> Response:
+        """Answer a GET from the cache: 304 if the client's ETag is current, the cached body otherwise."""
+        cached = await self.get_or_set(key, load, tags=tags, if_none_match=if_none_match)
+        if cached.body is None:
+            return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers={"ETag": cached.etag})
+        etag = {} if cached.version is None else {"ETag": cached.etag}
+        return RawJSONResponse(cached.body, headers={**(cached.headers or {}), **etag})
+
+    async def get_or_set(
+        self,
+        key: str,
+        load: Callable[[], Awaitable[Payload]],
+        tags: tuple[str, ...] = (),
+        if_none_match: str | None = None,
+    ) -> CachedValue:
+        """Return the cached value, computing it at most once on a miss."""
+        # промахи процесса делят одно вычисление, аренда в Redis держит другие воркеры; 404 тоже запоминается
+        if (cached := self.local.get(key)) is not None:
+            cache_stats.hit(key, l1=True)
+            return CachedValue(None, cached.version) if _etag_matches(cached.version, if_none_match) else cached
+        missing_key = negative_key(key)
+        if (detail := self.local.get(missing_key)) is not None:
+            cache_stats.hit(missing_key, l1=True)
+            raise _not_found(detail)
+        async with self.redis.pipeline(transaction=False) as pipe:
+            pipe.get(key).pttl(key).get(VERSION_PREFIX + key).get(missing_key)
+            payload, ttl_ms, version, detail = await pipe.execute()
+        if detail is not None:
+            cache_stats.hit(missing_key, l1=False)
+            self.local.set(missing_key, detail)
+            raise _not_found(detail)
+        if _etag_matches(version, if_none_match):
+            # версия меняется при любой инвалидации ключа, так что копия клиента актуальна
+            cache_stats.hit(key, l1=False)
+            return CachedValue(None, int(version))
+        stale = None
+        if payload is not None and version is not None:
+            body, headers = _unpack(_decompress(payload))
+            stale = CachedValue(body, int(version), headers)
+        if stale is not None and not self._should_refresh(key, ttl_ms):
+            cache_stats.hit(key, l1=False)
+            self.local.set(key, stale)
+            return stale
+        if stale is None:
+            cache_stats.miss(key)
+        else:
+            cache_stats.hit(key, l1=False)
+
+        if (task := _inflight.get(key)) is None:
+            task = asyncio.ensure_future(self._recompute(key, load, tags, stale=stale))
+            _inflight[key] = task
+            task.add_done_callback(lambda _: _inflight.pop(key, None))
+        return await asyncio.shield(task)
+
+    @staticmethod
+    def _should_refresh(key: str, ttl_ms: int) -> bool:
+        # вероятностное раннее обновление (XFetch): чем дольше пересчет и чем
+        # ближе истечение ключа, тем выше шанс пересчитать его заранее
+        delta = recompute_times.get(key)
+        if not config.CACHE_EARLY_REFRESH_BETA or delta is None or ttl_ms < 0:
+            return False
+        return -delta * config.CACHE_EARLY_REFRESH_BETA * math.log(1 - random.random()) * 1000 >= ttl_ms
+
+    async def _recompute(
+        self,
+        key: str,
+        load: Callable[[], Awaitable[Payload]],
+        tags: tuple[str, ...],
+        stale: CachedValue | None,
+    ) -> CachedValue:
+        token = uuid.uuid4().hex
+        lock = LOCK_PREFIX + key
+        if not await self.redis.set(lock, token, px=config.CACHE_LOCK_TIMEOUT_MS, nx=True):
+            if stale is not None:
+                # ключ уже обновляет другой процесс, а пока сгодится текущее значение
+                return stale
+            if (cached := await self._wait_for(key)) is not None:
+                return cached
+        try:
+            # запись, закоммиченная во время загрузки, могла не попасть в результат:
+            # такое значение не кешируется, иначе старое тело получило бы уже новую версию
+            catalog_version = await self.catalog_version()
+            start = time.perf_counter()
+            try:
+                result = await load()
+            except HTTPException as exc:
+                if exc.status_code == status.HTTP_404_NOT_FOUND:
+                    await self._set_missing(key, exc.detail)
+                raise
+            recompute_times.set(key, time.perf_counter() - start)
+            if isinstance(result, Loaded):
+                body, tags, headers = result.body, (*tags, *result.tags), result.headers
+            elif isinstance(result, bytes):
+                body, headers = result, None
+            else:
+                body, headers = result
+            async with self.writer() as writer:
+                writer.expected_catalog_version = catalog_version
+                writer.set(key, body, tags=tags, headers=headers)
+            return writer.written.get(key) or CachedValue(body, None, headers)
+        finally:
+            await self.redis.register_script(RELEASE_LOCK_SCRIPT)(keys=[lock], args=[token])
+
+    async def _wait_for(self, key: str) -> CachedValue | None:
+        deadline = time.monotonic() + config.CACHE_LOCK_TIMEOUT_MS / 1000
+        while time.monotonic() < deadline:
+            await asyncio.sleep(config.CACHE_LOCK_POLL_INTERVAL)
+            payload, version, detail = await self.redis.mget(key, VERSION_PREFIX + key, negative_key(key))
+            if detail is not None:
+                raise _not_found(detail)
+            if payload is not None and version is not None:
+                body, headers = _unpack(_decompress(payload))
+                cached = CachedValue(body, int(version), headers)
+                self.local.set(key, cached)
+                return cached
+        return None
+
+    async def _set_missing(self, key: str, detail: str) -> None:
+        # без тегов и версии: запись короткая, а при создании сущности ее удаляют явно
+        missing_key = negative_key(key)
+        ttl = cache_policy.ttl(missing_key)
+        await self.redis.set(missing_key, detail, ex=ttl)
+        self.local.set(missing_key, detail.encode(), ttl=ttl)
+        cache_stats.written(missing_key, len(detail))
+
+    def writer(self) -> "CacheWriter":
+        return CacheWriter(cache=self)
+
+    async def set(self, key: str, value: bytes, tags: tuple[str, ...] = ()) -> None:
+        async with self.writer() as writer:
+            writer.set(key, value, tags=tags)
+
+    async def invalidate(self, keys: tuple[str, ...] = (), tags: tuple[str, ...] = ()) -> None:
+        async with self.writer() as writer:
+            writer.invalidate(keys=keys, tags=tags)
+
+    async def catalog_version(self) -> int:
+        """Counter bumped by every invalidation, i.e. by every write to the catalog."""
+        return int(await self.redis.get(CATALOG_VERSION_KEY) or 0)
+
+
+@dataclass
+class CacheWriter:
+    """Unit of work for the cache, applied in one MULTI/EXEC after the database commit."""
+
+    cache: Cache
+    sets: list[tuple[str, bytes, int, tuple[str, ...], dict[str, str] | None]] = field(default_factory=list)
+    keys: list[str] = field(default_factory=list)
+    tags: list[str] = field(default_factory=list)
+    # значения с версиями, записанные при последнем flush
+    written: dict[str, CachedValue] = field(default_factory=dict)
+    # если задана: flush ничего не пишет, когда версия каталога успела от нее уйти
+    expected_catalog_version: int | None = None
+    # последний flush отброшен из-за изменения каталога
+    dropped: bool = False
+
+    async def __aenter__(self) -> "CacheWriter":
+        return self
+
+    async def __aexit__(self, exc_type, exc_value, traceback) -> None:
+        if exc_type is None:
+            await self.flush()
+
+    def set(
+        self,
+        key: str,
+        value: bytes,
+        tags: tuple[str, ...] = (),
+        headers: dict[str, str] | None = None,
+    ) -> None:
+        self.sets.append((key, value, cache_policy.ttl(key), tags, headers))
+
+    def invalidate(self, keys: tuple[str, ...] = (), tags: tuple[str, ...] = ()) -> None:
+        self.keys.extend(keys)
+        self.tags.extend(tags)
+
+    async def flush(self) -> None:
+        if not (self.sets or self.keys or self.tags):
+            return
+        try:
+            results = await self._execute()
+        except NoScriptError:
+            # Redis перезапускался и потерял скрипт; повтор безопасен, все операции идемпотентны
+            await self.cache.redis.script_load(INVALIDATE_SCRIPT)
+            results = await self._execute()
+
+        self.dropped = results is None
+        if results is None:
+            self.written = {}
+            self.sets, self.keys, self.tags = [], [], []
+            return
+        local = self.cache.local
+        local.pop(*self.keys)
+        if self.keys or self.tags:
+            # все ключи-кандидаты сбрасываются в L1, вытеснениями считаются только удаленные из Redis
+            deleted, evicted = ([key.decode() for key in part] for part in results.pop(0))
+            local.pop(*deleted)
+            cache_stats.evicted(evicted)
+        self.written = {}
+        for (key, value, ex, _, headers), version in zip(self.sets, results):
+            self.written[key] = CachedValue(value, int(version), headers)
+            local.set(key, self.written[key], ttl=ex)
+            cache_stats.written(key, len(value))
+        self.sets, self.keys, self.tags = [], [], []
+
+    async def _execute(self) -> list | None:
+        """Run the batch and return the invalidation result (if any) followed by the version of every write."""
+        # новый счетчик версий начинается с текущего времени в мс, чтобы после
+        # истечения ключа версия не повторила ту, что уже есть у клиентов
+        initial_version = time.time_ns() // 1_000_000
+        positions = []
+        async with self.cache.redis.pipeline(transaction=True) as pipe:
+            if self.expected_catalog_version is not None:
+                # WATCH ловит изменение до EXEC, сравнение - то, что случилось раньше
+                await pipe.watch(CATALOG_VERSION_KEY)
+                if int(await pipe.get(CATALOG_VERSION_KEY) or 0) != self.expected_catalog_version:
+                    return None
+                pipe.multi()
+            if self.keys or self.tags:
+                pipe.evalsha(
+                    INVALIDATE_SCRIPT_SHA,
+                    len(self.keys) + len(self.tags),
+                    *self.keys,
+                    *(TAG_PREFIX + tag for tag in self.tags),
+                    config.CACHE_INVALIDATION_CHANNEL,
+                    len(self.keys),
+                )
+                positions.append(len(pipe))
+                pipe.incr(CATALOG_VERSION_KEY)
+            for key, value, ex, tags, headers in self.sets:
+                pipe.set(key, _compress(_pack(value, headers)), ex=ex)
+                pipe.set(VERSION_PREFIX + key, initial_version, nx=True)
+                # счетчик живет столько же, сколько теги, чтобы каскадная инвалидация его нашла
+                pipe.expire(VERSION_PREFIX + key, config.CACHE_TAG_EXPIRE_IN_SEC)
+                pipe.get(VERSION_PREFIX + key)
+                positions.append(len(pipe))
+                for tag in tags:
+                    pipe.sadd(TAG_PREFIX + tag, key)
+                    pipe.expire(TAG_PREFIX + tag, config.CACHE_TAG_EXPIRE_IN_SEC)
+            try:
+                results = await pipe.execute()
+            except WatchError:
+                return None
+        return [results[position - 1] for position in positions]
+
+
+async def get_cache(redis: Redis = Depends(get_redis)) -> Cache:
+    return Cache(redis=redis)
+
+
+def _apply_invalidation(message: bytes) -> None:
+    local_cache.pop(*json.loads(message))
+
+
+async def _listen_for_invalidations(redis: Redis) -> None:
+    while True:
+        try:
+            async with redis.pubsub() as pubsub:
+                await pubsub.subscribe(config.CACHE_INVALIDATION_CHANNEL)
+                while True:
+                    message = await pubsub.get_message(ignore_subscribe_messages=True, timeout=1.0)
+                    if message is not None:
+                        _apply_invalidation(message["data"])
+        except asyncio.CancelledError:
+            raise
+        except Exception:
+            # пока подписка не работала, могли потеряться сообщения об инвалидации
+            logger.exception("cache invalidation listener failed, reconnecting")
+            local_cache.clear()
+            await asyncio.sleep(1)
+
+
+_listener: asyncio.Task | None = None
+
+
+async def start_invalidation_listener() -> None:
+    global _listener
+    if _listener is None:
+        _listener = asyncio.create_task(_listen_for_invalidations(await get_redis()))
+
+
+async def stop_invalidation_listener() -> None:
+    global _listener
+    if _listener is not None:
+        _listener.cancel()
+        try:
+            await _listener
+        except asyncio.CancelledError:
+            pass
+    _listener = None
+    local_cache.clear()
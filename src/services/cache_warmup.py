@@ -0,0 +1,166 @@
+import logging
+import time
+from collections.abc import AsyncGenerator, AsyncIterator, Callable
+from contextlib import aclosing
+
+from src.api.v1.schemas import DishResponse, MenuResponse, SubMenuResponse
+from src.core import config
+from src.db import async_session, get_redis
+from src.models import Dish, Menu, SubMenu
+from src.services.cache_utils import (
+    Cache,
+    CachePolicy,
+    negative_key,
+    page_key,
+    render,
+    render_page,
+)
+from src.services.crud_utils import CRUD
+
+__all__ = ("warm_up_cache", "warm_up_cache_on_startup")
+
+logger = logging.getLogger(__name__)
+
+WARMUP_LOCK = "lock:cache_warmup"
+
+CacheEntry = tuple[str, bytes, tuple[str, ...], dict[str, str] | None]
+
+
+def _first_page(list_key: str, items: list, tags: tuple[str, ...]) -> CacheEntry:
+    limit = config.LIST_PAGE_SIZE
+    body, headers = render_page(items[: limit + 1], limit)
+    return page_key(list_key, 0, limit), body, (list_key, *tags), headers
+
+
+def _dish_tags(submenu_id: int, menu_of_submenu: dict[int, int]) -> tuple[str, ...]:
+    if submenu_id in menu_of_submenu:
+        return f"submenu_{submenu_id}", f"menu_{menu_of_submenu[submenu_id]}"
+    return (f"submenu_{submenu_id}",)
+
+
+async def _family(
+    rows: AsyncIterator[dict],
+    schema: type[MenuResponse | SubMenuResponse | DishResponse],
+    name: str,
+    list_key: Callable[[dict], str],
+    tags: Callable[[dict], tuple[str, ...]],
+) -> AsyncIterator[CacheEntry]:
+    """Detail keys of the rows and the first list page of every owner, rows come ordered by (owner, id)."""
+    limit = config.LIST_PAGE_SIZE
+    page: list = []
+    current = ""
+    page_tags: tuple[str, ...] = ()
+    async for row in rows:
+        if list_key(row) != current:
+            if current and len(page) <= limit:
+                yield _first_page(current, page, page_tags)
+            page, current, page_tags = [], list_key(row), tags(row)
+        item = schema(**row)
+        if len(page) <= limit:
+            page.append(item)
+            if len(page) > limit:
+                yield _first_page(current, page, page_tags)
+        yield f"{name}_{item.id}", render(item), page_tags, None
+    if current and len(page) <= limit:
+        yield _first_page(current, page, page_tags)
+
+
+async def _remember_menus(rows: AsyncIterator[dict], menu_of_submenu: dict[int, int]) -> AsyncIterator[dict]:
+    async for row in rows:
+        menu_of_submenu[row["id"]] = row["owner"]
+        yield row
+
+
+async def _entries(
+    crud: CRUD,
+    menu_ids: list[int] | None,
+    submenu_ids: list[int] | None,
+) -> AsyncGenerator[CacheEntry, None]:
+    # сущности читаются потоком по (owner, id), в памяти - только номера меню подменю для тегов блюд
+    menu_of_submenu: dict[int, int] = {}
+    if menu_ids is None:
+        menus = crud.stream_rows(Menu, None, 0)
+        menu_list = "menu_list"
+        submenu_where = (SubMenu.owner.is_not(None),)
+        dish_where = (Dish.owner.is_not(None),)
+    else:
+        # только заданные меню: первая страница списка всех меню из них не собирается
+        menus = crud.stream_rows(Menu, None, 0, (CRUD.any_of(Menu.id, menu_ids),))
+        menu_list = ""
+        submenu_where = (CRUD.any_of(SubMenu.owner, menu_ids),)
+        dish_where = (CRUD.any_of(Dish.owner, submenu_ids or []),)
+    async for entry in _family(menus, MenuResponse, "menu", lambda row: menu_list, lambda row: ()):
+        yield entry
+    submenus = _remember_menus(
+        crud.stream_rows(SubMenu, None, 0, submenu_where, SubMenu.owner),
+        menu_of_submenu,
+    )
+    async for entry in _family(
+        submenus,
+        SubMenuResponse,
+        "submenu",
+        lambda row: f"submenu_list_{row['owner']}",
+        lambda row: (f"menu_{row['owner']}",),
+    ):
+        yield entry
+    dishes = crud.stream_rows(Dish, None, 0, dish_where, Dish.owner)
+    async for entry in _family(
+        dishes,
+        DishResponse,
+        "dish",
+        lambda row: f"dish_list_{row['owner']}",
+        lambda row: _dish_tags(row["owner"], menu_of_submenu),
+    ):
+        yield entry
+
+
+async def warm_up_cache(
+    crud: CRUD,
+    cache: Cache,
+    menu_ids: list[int] | None = None,
+    submenu_ids: list[int] | None = None,
+) -> dict:
+    """Load the catalog (or the given menus) into Redis until the time or memory budget is spent."""
+    start = time.monotonic()
+    deadline = start + config.CACHE_WARMUP_TIME_BUDGET
+    keys = size = 0
+    complete = True
+
+    async with cache.writer() as writer, aclosing(_entries(crud, menu_ids, submenu_ids)) as entries:
+        # пакет, во время чтения которого изменился каталог, отбрасывается целиком
+        writer.expected_catalog_version = await cache.catalog_version()
+        async for key, body, tags, headers in entries:
+            if time.monotonic() > deadline or size + len(body) > config.CACHE_WARMUP_MEMORY_BUDGET:
+                complete = False
+                break
+            writer.set(key, body, tags=tags, headers=headers)
+            if CachePolicy.family(key) == CachePolicy.DETAIL:
+                # сущность могла запрашиваться до создания, 404 в кэше больше не актуален
+                writer.invalidate(keys=(negative_key(key),))
+            keys += 1
+            size += len(body)
+            if len(writer.sets) >= config.CACHE_WARMUP_BATCH_SIZE:
+                await writer.flush()
+                complete = complete and not writer.dropped
+                writer.expected_catalog_version = await cache.catalog_version()
+    complete = complete and not writer.dropped
+
+    return {
+        "keys": keys,
+        "bytes": size,
+        "complete": complete,
+        "seconds": round(time.monotonic() - start, 3),
+    }
+
+
+async def warm_up_cache_on_startup() -> None:
+    redis = await get_redis()
+    # все воркеры стартуют одновременно, прогревать кеш достаточно одному
+    if not await redis.set(WARMUP_LOCK, 1, ex=max(int(config.CACHE_WARMUP_TIME_BUDGET), 1), nx=True):
+        return
+    try:
+        async with async_session() as db:
+            report = await warm_up_cache(CRUD(db), Cache(redis=redis))
+        logger.info("cache warm-up: %s", report)
+    except Exception:
+        logger.exception("cache warm-up failed")
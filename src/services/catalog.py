@@ -0,0 +1,86 @@
+import json
+import time
+from dataclasses import dataclass, field
+
+import yaml
+from asyncpg.exceptions import UniqueViolationError
+from fastapi import HTTPException, status
+from pydantic import parse_obj_as
+from sqlalchemy.exc import IntegrityError
+
+from src.api.v1.schemas import CatalogMenu
+from src.models import Dish, Menu, SubMenu
+from src.services.crud_utils import CRUD
+
+__all__ = ("CatalogLoader", "load_catalog_file")
+
+
+def load_catalog_file(path: str) -> list[dict]:
+    """Read a catalog document, JSON or YAML depending on the extension."""
+    with open(path, encoding="utf-8") as file:
+        if path.endswith(".json"):
+            return json.load(file)
+        return yaml.safe_load(file)
+
+
+@dataclass
+class CatalogLoader:
+    """Bulk loader for a whole catalog in one transaction: multi-row INSERT for menus and submenus, COPY for dishes."""
+
+    crud: CRUD
+    # id созданных строк по префиксам ключей кеша: menu, submenu, dish
+    created: dict[str, list[int]] = field(default_factory=dict)
+
+    async def load(self, catalog: list[CatalogMenu] | list[dict]) -> dict:
+        start = time.monotonic()
+        menus: list[CatalogMenu] = parse_obj_as(list[CatalogMenu], catalog)
+        submenus_count = dishes_count = 0
+        try:
+            menu_rows = [
+                {
+                    "title": menu.title,
+                    "description": menu.description,
+                    "submenus_count": len(menu.submenus),
+                    "dishes_count": sum(len(submenu.dishes) for submenu in menu.submenus),
+                }
+                for menu in menus
+            ]
+            menu_ids = dict(await self.crud.insert_many(Menu, menu_rows, Menu.title, Menu.id))
+
+            submenu_rows = [
+                {
+                    "title": submenu.title,
+                    "description": submenu.description,
+                    "dishes_count": len(submenu.dishes),
+                    "owner": menu_ids[menu.title],
+                }
+                for menu in menus
+                for submenu in menu.submenus
+            ]
+            submenu_ids = dict(await self.crud.insert_many(SubMenu, submenu_rows, SubMenu.title, SubMenu.id))
+            submenus_count = len(submenu_rows)
+
+            dish_records = [
+                (dish.title, dish.description, dish.price, submenu_ids[submenu.title])
+                for menu in menus
+                for submenu in menu.submenus
+                for dish in submenu.dishes
+            ]
+            await self.crud.copy_rows(Dish, ["title", "description", "price", "owner"], dish_records)
+            dishes_count = len(dish_records)
+            dish_ids = await self.crud.get_ids(Dish, list(submenu_ids.values()))
+            await self.crud.commit()
+        except (IntegrityError, UniqueViolationError):
+            # название уже занято (или повторяется в самом документе) - не загружается ничего
+            await self.crud.rollback()
+            raise HTTPException(
+                status_code=status.HTTP_409_CONFLICT,
+                detail="failed to import catalog",
+            )
+        self.created = {"menu": list(menu_ids.values()), "submenu": list(submenu_ids.values()), "dish": dish_ids}
+        return {
+            "menus": len(menus),
+            "submenus": submenus_count,
+            "dishes": dishes_count,
+            "seconds": round(time.monotonic() - start, 3),
+        }
@@ -1,29 +1,157 @@
+from collections.abc import AsyncIterator, Sequence
 from dataclasses import dataclass
+from typing import Any
 
-from sqlalchemy import select, update
+from sqlalchemy import Integer, any_, bindparam, delete, select, text, tuple_, update
+from sqlalchemy.dialects import postgresql
+from sqlalchemy.dialects.postgresql import insert as pg_insert
 from sqlalchemy.engine import Row
 from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import InstrumentedAttribute
+from sqlalchemy.sql import ColumnElement
 
-from src.api.v1.schemas import DishBase, MenuBase, SubMenuBase
+from src.api.v1.schemas import DishUpdate, MenuUpdate, SubMenuUpdate
+from src.core import config
+from src.db import ReplicaReader
 from src.models import Dish, Menu, SubMenu
 
 __all__ = ("CRUD",)
 
+# Предел числа параметров в одном запросе asyncpg (32767), по нему режутся многострочные INSERT
+BIND_PARAMS_LIMIT = 32767
+
 
 @dataclass
 class CRUD:
     db: AsyncSession
+    # реплика для чтения, None - читать из основной БД
+    read_db: ReplicaReader | None = None
+
+    async def reader(self) -> AsyncSession:
+        """Session for reads that do not fill the shared cache: the replica if it can be used, else the primary."""
+        # то, что попадает в кеш, читается только из основной БД: отстающая реплика закешировала бы старые строки
+        replica = None if self.read_db is None else await self.read_db.session()
+        return replica or self.db
+
+    async def insert_many(
+        self,
+        entity: type[Menu | SubMenu | Dish],
+        rows: list[dict],
+        *returning,
+        skip_conflicts: bool = False,
+    ) -> list[Row]:
+        """Multi-row INSERT ... RETURNING in the current transaction, split by the bind parameter limit."""
+        # со skip_conflicts строки с занятым названием пропускаются (ON CONFLICT DO NOTHING)
+        inserted: list[Row] = []
+        if not rows:
+            return inserted
+        step = BIND_PARAMS_LIMIT // len(rows[0])
+        for start in range(0, len(rows), step):
+            end = start + step
+            query = pg_insert(entity).values(rows[start:end])
+            if skip_conflicts:
+                query = query.on_conflict_do_nothing(index_elements=[entity.title])
+            data = await self.db.execute(query.returning(*returning))
+            inserted.extend(data.fetchall())
+        return inserted
 
-    async def add_to_db(self, item: Menu | SubMenu | Dish):
-        self.db.add(item)
+    async def copy_rows(
+        self,
+        entity: type[Menu | SubMenu | Dish],
+        columns: list[str],
+        records: Sequence[tuple],
+    ) -> None:
+        """Load rows with COPY on the session's connection, i.e. in the current transaction."""
+        connection = await self.db.connection()
+        raw_connection = await connection.get_raw_connection()
+        await raw_connection.driver_connection.copy_records_to_table(
+            entity.__tablename__,
+            records=records,
+            columns=columns,
+        )
+
+    async def commit(self):
         await self.db.commit()
-        await self.db.refresh(item)
 
-    async def get_all(self, entity: type[Menu | SubMenu | Dish]):
-        query = select(entity)
-        data: Row = await self.db.execute(query)
-        d = data.scalars().all()
-        return d
+    async def rollback(self):
+        await self.db.rollback()
+
+    @staticmethod
+    def _keyset(
+        entity: type[Menu | SubMenu | Dish],
+        owner: int | None,
+        after_id: int,
+        where: tuple[ColumnElement, ...],
+        order_by: InstrumentedAttribute | None,
+        after_value: Any,
+    ) -> list[tuple[list[ColumnElement], tuple[InstrumentedAttribute, ...]]]:
+        """Conditions and sort keys of the consecutive parts of a keyset page in (order_by, id) order."""
+        # курсор (after_value, after_id) приходит от клиента, удаленная строка курсора страницу не ломает;
+        # строки с NULL в order_by идут последними, как в ORDER BY ASC, и читаются отдельно по id
+        conditions = list(where)
+        if owner is not None:
+            conditions.append(entity.owner == owner)
+        if order_by is None:
+            return [([*conditions, entity.id > after_id], (entity.id,))]
+        parts: list[tuple[list[ColumnElement], tuple[InstrumentedAttribute, ...]]] = []
+        if not after_id or after_value is not None:
+            # по индексу (owner, order_by, id) без сортировки
+            cursor = [tuple_(order_by, entity.id) > tuple_(after_value, after_id)] if after_id else []
+            parts.append(([*conditions, order_by.is_not(None), *cursor], (order_by, entity.id)))
+        nulls_after = after_id if after_id and after_value is None else 0
+        parts.append(([*conditions, order_by.is_(None), entity.id > nulls_after], (entity.id,)))
+        return parts
+
+    async def get_page(
+        self,
+        entity: type[Menu | SubMenu | Dish],
+        owner: int | None,
+        after_id: int,
+        limit: int,
+        where: tuple[ColumnElement, ...] = (),
+        order_by: InstrumentedAttribute | None = None,
+        after_value: Any = None,
+    ):
+        """Keyset page: rows of the owner after the cursor, at most limit of them."""
+        rows: list = []
+        for conditions, keys in self._keyset(entity, owner, after_id, where, order_by, after_value):
+            query = select(entity).where(*conditions).order_by(*keys).limit(limit - len(rows))
+            data: Row = await self.db.execute(query)
+            rows.extend(data.scalars().all())
+            if len(rows) == limit:
+                break
+        return rows
+
+    async def stream_rows(
+        self,
+        entity: type[Menu | SubMenu | Dish],
+        owner: int | None,
+        after_id: int,
+        where: tuple[ColumnElement, ...] = (),
+        order_by: InstrumentedAttribute | None = None,
+        after_value: Any = None,
+    ) -> AsyncIterator[dict]:
+        """All rows of the owner after the cursor, read from a server-side cursor."""
+        # выбираются колонки, а не сущности, чтобы ничего не копилось в identity map
+        for conditions, keys in self._keyset(entity, owner, after_id, where, order_by, after_value):
+            query = (
+                select(*entity.__table__.columns)
+                .where(*conditions)
+                .order_by(*keys)
+                .execution_options(yield_per=config.STREAM_YIELD_PER)
+            )
+            result = await (await self.reader()).stream(query)
+            async for row in result.mappings():
+                yield row
+
+    @staticmethod
+    def any_of(column: InstrumentedAttribute, ids: list[int]) -> ColumnElement:
+        # column = ANY(:ids) - один параметр-массив вместо IN с параметром на каждый id
+        return column == any_(bindparam(None, ids, type_=postgresql.ARRAY(Integer)))
+
+    async def get_ids(self, entity: type[Menu | SubMenu | Dish], owners: list[int]) -> list[int]:
+        data = await self.db.execute(select(entity.id).where(self.any_of(entity.owner, owners)))
+        return list(data.scalars())
 
     async def get_from_db_by_id(
         self,
@@ -35,31 +163,125 @@ class CRUD:
         d = data.fetchone()
         return [] if not d else d[0]
 
-    async def get_from_db_by_title(
+    async def get_with_parent_owner(
         self,
-        entity: type[Menu | SubMenu | Dish],
-        title: str,
-    ):
-        query = select(entity).where(entity.title == title)
-        data: Row = await self.db.execute(query)
+        entity: type[SubMenu | Dish],
+        parent: type[Menu | SubMenu],
+        required_id: int,
+    ) -> Row | None:
+        """Row (entity, owner of its parent), e.g. a dish together with the menu of its submenu."""
+        query = select(entity, parent.owner).join(parent, parent.id == entity.owner).where(entity.id == required_id)
+        data = await self.db.execute(query)
         return data.fetchone()
 
+    async def insert_unique(self, entity: type[Menu | SubMenu | Dish], values: dict) -> dict | None:
+        """INSERT ... ON CONFLICT (title) DO NOTHING RETURNING *, None and a rollback if the title is taken."""
+        # коммитится вместе с изменениями, сделанными до него (например, счетчиками)
+        query = (
+            pg_insert(entity)
+            .values(**values)
+            .on_conflict_do_nothing(index_elements=[entity.title])
+            .returning(*entity.__table__.columns)
+        )
+        data = await self.db.execute(query)
+        row = data.mappings().fetchone()
+        if row is None:
+            await self.db.rollback()
+            return None
+        await self.db.commit()
+        return dict(row)
+
     async def update_data(
         self,
         required_id: int,
         entity: type[Menu | SubMenu | Dish],
-        updated_data: DishBase | MenuBase | SubMenuBase,
-    ):
-        upd_data = updated_data.dict()
-        query = update(entity).where(entity.id == required_id).values(**upd_data).returning(entity)
-        data: Row = await self.db.execute(query)
+        updated_data: DishUpdate | MenuUpdate | SubMenuUpdate,
+    ) -> dict | None:
+        """UPDATE ... RETURNING * of the fields present in the request, None if there is no such row."""
+        upd_data = updated_data.dict(exclude_unset=True, exclude_none=True)
+        if upd_data:
+            query = (
+                update(entity)
+                .where(entity.id == required_id)
+                .values(**upd_data)
+                .returning(*entity.__table__.columns)
+                .execution_options(synchronize_session=False)
+            )
+        else:
+            # обновлять нечего - достаточно вернуть текущую строку
+            query = select(*entity.__table__.columns).where(entity.id == required_id)
+        data = await self.db.execute(query)
+        row = data.mappings().fetchone()
         await self.db.commit()
-        return dict(data.fetchone())
+        return None if row is None else dict(row)
 
-    async def delete_from_db(self, item: Menu | SubMenu | Dish):
-        await self.db.delete(item)
-        await self.db.commit()
+    async def update_many(
+        self,
+        entity: type[Menu | SubMenu | Dish],
+        owner: int,
+        rows: list[dict],
+        columns: list[str],
+    ) -> list[dict]:
+        """One UPDATE ... FROM unnest(...) RETURNING * for the rows of the owner, in the current transaction."""
+        # значения идут одним массивом на колонку, число строк не ограничено числом параметров;
+        # None оставляет текущее значение колонки
+        table = entity.__table__
+        types = {name: table.c[name].type.compile(dialect=postgresql.dialect()) for name in ["id", *columns]}
+        arrays = ", ".join(f"CAST(:{name} AS {column_type}[])" for name, column_type in types.items())
+        assignments = ", ".join(f"{name} = coalesce(v.{name}, {table.name}.{name})" for name in columns)
+        returning = ", ".join(f"{table.name}.{column.name}" for column in table.columns)
+        query = text(
+            f"UPDATE {table.name} SET {assignments} "
+            f"FROM unnest({arrays}) AS v(id, {', '.join(columns)}) "
+            f"WHERE {table.name}.id = v.id AND {table.name}.owner = :owner RETURNING {returning}",
+        )
+        params: dict[str, Any] = {name: [row.get(name) for row in rows] for name in types}
+        data = await self.db.execute(query, {**params, "owner": owner})
+        return [dict(row) for row in data.mappings()]
+
+    async def delete_many(self, entity: type[Menu | SubMenu | Dish], owner: int, ids: list[int]) -> list[int]:
+        """DELETE ... RETURNING id of the rows of the owner, in the current transaction."""
+        query = (
+            delete(entity)
+            .where(entity.owner == owner, entity.id.in_(ids))
+            .returning(entity.id)
+            .execution_options(synchronize_session=False)
+        )
+        data = await self.db.execute(query)
+        return list(data.scalars())
+
+    async def change_counters(
+        self,
+        entity: type[Menu | SubMenu],
+        required_id: int,
+        **deltas: int | ColumnElement,
+    ):
+        """Shift counter columns by one UPDATE ... SET col = col + delta, committed with the next write."""
+        # сначала всегда меню, потом подменю - параллельные запросы блокируют строки в одном порядке
+        values = {name: getattr(entity, name) + delta for name, delta in deltas.items()}
+        query = (
+            update(entity).where(entity.id == required_id).values(**values).execution_options(synchronize_session=False)
+        )
+        await self.db.execute(query)
 
-    async def get_full_menu(self, query: str):
+    async def delete_by_id(self, entity: type[Menu | SubMenu | Dish], required_id: int) -> dict | None:
+        """DELETE ... RETURNING *, None and a rollback if there is no such row; children go by ON DELETE CASCADE."""
+        # коммитится вместе с изменениями, сделанными до него (например, счетчиками)
+        query = (
+            delete(entity)
+            .where(entity.id == required_id)
+            .returning(*entity.__table__.columns)
+            .execution_options(synchronize_session=False)
+        )
         data = await self.db.execute(query)
-        return data.fetchall()
+        row = data.mappings().fetchone()
+        if row is None:
+            await self.db.rollback()
+            return None
+        await self.db.commit()
+        return dict(row)
+
+    async def get_json(self, query: str) -> bytes:
+        """Single JSON value built by the query in Postgres, returned as is."""
+        data = await self.db.execute(text(query))
+        return data.scalar_one().encode()
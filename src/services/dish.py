@@ -1,51 +1,138 @@
-import json
 from dataclasses import dataclass
+from decimal import Decimal
 from functools import lru_cache
 
-from fastapi import Depends, HTTPException, status
-from fastapi.encoders import jsonable_encoder
+from fastapi import Depends, HTTPException, Response, status
+from fastapi.responses import StreamingResponse
+from sqlalchemy.exc import IntegrityError
 from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import InstrumentedAttribute
 
-from src.api.v1.schemas.dish import DishBase, DishCreate, DishResponse
-from src.db import Redis, get_db, get_redis
+from src.api.v1.schemas.dish import (
+    DishBatchResult,
+    DishBatchUpdate,
+    DishCreate,
+    DishResponse,
+    DishUpdate,
+)
+from src.db import ReplicaReader, get_db, get_read_db
 from src.models import Dish, Menu, SubMenu
-from src.services import CRUD
+from src.services import (
+    CRUD,
+    Cache,
+    Loaded,
+    get_cache,
+    negative_key,
+    page_key,
+    render,
+    render_page,
+    render_stream,
+)
 
 __all__ = ("DishService", "get_dish_service")
 
 
+def parse_cursor(cursor: str, sort: str | None) -> tuple[int, Decimal | None]:
+    """(id, price) of X-Next-Cursor: "id" for pages by id, "price:id" for sort=price (empty price is NULL)."""
+    price, separator, after_id = cursor.rpartition(":")
+    # первая страница ("0") одинакова при любой сортировке
+    if (sort == "price") != bool(separator) and after_id != "0":
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="cursor does not match sort",
+        )
+    return int(after_id), Decimal(price) if price else None
+
+
 @dataclass
 class DishService:
-    cache: Redis
+    cache: Cache
     crud: CRUD
 
-    async def get_dish_list(self) -> list[DishResponse]:
-        if from_cache := await self.cache.get("dish_list"):
-            return json.loads(from_cache)
+    async def get_dish_list(
+        self,
+        menu_id: int,
+        submenu_id: int,
+        cursor: str,
+        limit: int,
+        if_none_match: str | None = None,
+        stream: bool = False,
+        min_price: Decimal | None = None,
+        max_price: Decimal | None = None,
+        sort: str | None = None,
+    ) -> Response:
+        after_id, after_price = parse_cursor(cursor, sort)
+        where = []
+        if min_price is not None:
+            where.append(Dish.price >= min_price)
+        if max_price is not None:
+            where.append(Dish.price <= max_price)
+        order_by = Dish.price if sort == "price" else None
+        if stream:
+            rows = self.crud.stream_rows(Dish, submenu_id, after_id, tuple(where), order_by, after_price)
+            return StreamingResponse(
+                render_stream(DishResponse(**row) async for row in rows),
+                media_type="application/json",
+            )
+        return await self.cache.respond(
+            page_key(
+                f"dish_list_{submenu_id}",
+                after_id,
+                limit,
+                min_price=min_price,
+                max_price=max_price,
+                sort=sort,
+                after_price=after_price,
+            ),
+            lambda: self._load_dish_page(submenu_id, after_id, limit, tuple(where), order_by, after_price),
+            # тег меню добавляет загрузка по владельцу подменю: menu_id в URL может быть чужим
+            tags=(f"dish_list_{submenu_id}", f"submenu_{submenu_id}"),
+            if_none_match=if_none_match,
+        )
 
-        data = await self.crud.get_all(Dish)
+    async def _load_dish_page(
+        self,
+        submenu_id: int,
+        after_id: int,
+        limit: int,
+        where: tuple = (),
+        order_by: InstrumentedAttribute | None = None,
+        after_price: Decimal | None = None,
+    ) -> Loaded:
+        submenu: SubMenu = await self.crud.get_from_db_by_id(SubMenu, submenu_id)
+        data = await self.crud.get_page(Dish, submenu_id, after_id, limit + 1, where, order_by, after_price)
         dish_list: list[DishResponse] = [
             DishResponse(
                 **dish.to_dict(),
             )
             for dish in data
         ]
-        await self.cache.set("dish_list", json.dumps(jsonable_encoder(dish_list)), ex=60)
-        return dish_list
+        body, headers = render_page(dish_list, limit, sort_key=None if order_by is None else "price")
+        return Loaded(body, tags=(f"menu_{submenu.owner}",) if submenu else (), headers=headers)
 
-    async def get_dish_by_id(self, dish_id: int) -> DishResponse:
-        if from_cache := await self.cache.get(f"dish_{dish_id}"):
-            return DishResponse(**json.loads(from_cache))
+    async def get_dish_by_id(
+        self,
+        menu_id: int,
+        submenu_id: int,
+        dish_id: int,
+        if_none_match: str | None = None,
+    ) -> Response:
+        # теги подменю и меню берутся из строки, а не из пути: id родителей в URL могут быть чужими
+        return await self.cache.respond(
+            f"dish_{dish_id}",
+            lambda: self._load_dish(dish_id),
+            if_none_match=if_none_match,
+        )
 
-        dish: Dish = await self.crud.get_from_db_by_id(Dish, dish_id)
-        if not dish:
+    async def _load_dish(self, dish_id: int) -> Loaded:
+        row = await self.crud.get_with_parent_owner(Dish, SubMenu, dish_id)
+        if row is None:
             raise HTTPException(
                 status_code=status.HTTP_404_NOT_FOUND,
                 detail="dish not found",
             )
-        serialized_data: dict = dish.to_dict()
-        await self.cache.set(f"dish_{dish_id}", json.dumps(jsonable_encoder(serialized_data)), ex=60)
-        return DishResponse(**serialized_data)
+        dish, menu_id = row
+        return Loaded(render(DishResponse(**dish.to_dict())), tags=(f"menu_{menu_id}", f"submenu_{dish.owner}"))
 
     async def create_dish(
         self,
@@ -53,67 +140,144 @@ class DishService:
         submenu_id: int,
         new_dish: DishCreate,
     ) -> DishResponse:
-        price = new_dish.price[:-1] if len(new_dish.price) - new_dish.price.find(".") != 3 else new_dish.price
-        new_dish.price = price
-        dish: Dish = Dish(**new_dish.dict())
-        dish.owner = submenu_id
-
-        if await self.crud.get_from_db_by_title(Dish, new_dish.title):
+        # счетчики меняются до вставки (порядок блокировок меню -> подменю),
+        # при конфликте названия insert_unique откатывает и их
+        await self.crud.change_counters(Menu, menu_id, dishes_count=1)
+        await self.crud.change_counters(SubMenu, submenu_id, dishes_count=1)
+        dish: dict | None = await self.crud.insert_unique(Dish, {**new_dish.dict(), "owner": submenu_id})
+        if dish is None:
             raise HTTPException(
                 status_code=status.HTTP_409_CONFLICT,
                 detail="failed to add dish",
             )
-        menu: Menu = await self.crud.get_from_db_by_id(Menu, menu_id)
-        submenu: SubMenu = await self.crud.get_from_db_by_id(SubMenu, submenu_id)
-        menu.dishes_count += 1
-        submenu.dishes_count += 1
-        await self.crud.add_to_db(dish)
-
-        serialized_data: dict = dish.to_dict()
-        await self.cache.set(f"dish_{dish.id}", json.dumps(serialized_data), 300)
-        await self.cache.delete(f"menu_{menu_id}")
-        await self.cache.delete(f"submenu_{submenu_id}")
-        await self.cache.delete("menu_list")
-        await self.cache.delete("submenu_list")
-        await self.cache.delete("dish_list")
-        return DishResponse(**serialized_data)
-
-    async def update_dish(self, dish_id: int, updated_data: DishBase) -> DishResponse:
-        if not await self.crud.get_from_db_by_id(Dish, dish_id):
+
+        created = DishResponse(**dish)
+        async with self.cache.writer() as writer:
+            writer.set(
+                f"dish_{created.id}",
+                render(created),
+                tags=(f"menu_{menu_id}", f"submenu_{submenu_id}"),
+            )
+            writer.invalidate(
+                keys=(negative_key(f"dish_{created.id}"), f"menu_{menu_id}", f"submenu_{submenu_id}"),
+                tags=("menu_list", f"submenu_list_{menu_id}", f"dish_list_{submenu_id}"),
+            )
+        return created
+
+    async def update_dish(self, dish_id: int, updated_data: DishUpdate) -> DishResponse:
+        updated: dict | None = await self.crud.update_data(dish_id, Dish, updated_data)
+        if updated is None:
             raise HTTPException(
                 status_code=status.HTTP_404_NOT_FOUND,
                 detail="dish not found",
             )
-        updated: dict = await self.crud.update_data(dish_id, Dish, updated_data)
-        await self.cache.delete(f"dish_{dish_id}")
-        await self.cache.delete("dish_list")
+        await self.cache.invalidate(keys=(f"dish_{dish_id}",), tags=(f"dish_list_{updated['owner']}",))
         return DishResponse(**updated)
 
     async def delete_dish(self, menu_id: int, submenu_id: int, dish_id: int) -> dict:
-        to_del: Dish = await self.crud.get_from_db_by_id(Dish, dish_id)
-        if not to_del:
+        # если блюда нет, delete_by_id откатит и счетчики
+        await self.crud.change_counters(Menu, menu_id, dishes_count=-1)
+        await self.crud.change_counters(SubMenu, submenu_id, dishes_count=-1)
+        if not await self.crud.delete_by_id(Dish, dish_id):
             raise HTTPException(
                 status_code=status.HTTP_404_NOT_FOUND,
                 detail="dish not found",
             )
-        menu: Menu = await self.crud.get_from_db_by_id(Menu, menu_id)
-        submenu: SubMenu = await self.crud.get_from_db_by_id(SubMenu, submenu_id)
-        menu.dishes_count -= 1
-        submenu.dishes_count -= 1
-        await self.crud.delete_from_db(to_del)
-        await self.cache.delete(f"menu_{menu_id}")
-        await self.cache.delete(f"submenu_{submenu_id}")
-        await self.cache.delete(f"dish_{dish_id}")
-        await self.cache.delete("menu_list")
-        await self.cache.delete("submenu_list")
-        await self.cache.delete("dish_list")
+        await self.cache.invalidate(
+            keys=(f"dish_{dish_id}", f"menu_{menu_id}", f"submenu_{submenu_id}"),
+            tags=("menu_list", f"submenu_list_{menu_id}", f"dish_list_{submenu_id}"),
+        )
         return {"status": "true", "message": "The dish has been deleted"}
 
+    async def create_dishes(
+        self,
+        menu_id: int,
+        submenu_id: int,
+        new_dishes: list[DishCreate],
+    ) -> list[DishBatchResult]:
+        """Insert the dishes with one multi-row statement, a taken title skips only its own dish."""
+        rows = [{**dish.dict(), "owner": submenu_id} for dish in new_dishes]
+        try:
+            inserted = await self.crud.insert_many(Dish, rows, Dish.title, Dish.id, skip_conflicts=True)
+        except IntegrityError:
+            raise await self._batch_error(submenu_id, "failed to add dishes")
+        ids: dict[str, int] = dict(inserted)
+        keys = [negative_key(f"dish_{dish_id}") for dish_id in ids.values()]
+        await self._commit_batch(menu_id, submenu_id, len(ids), keys=keys)
+        # повтор названия внутри пакета - тоже конфликт: создается только первое блюдо
+        results = []
+        for dish in new_dishes:
+            if (dish_id := ids.pop(dish.title, None)) is None:
+                results.append(DishBatchResult(status="conflict"))
+            else:
+                results.append(DishBatchResult(status="created", id=str(dish_id)))
+        return results
+
+    async def update_dishes(
+        self,
+        menu_id: int,
+        submenu_id: int,
+        items: list[DishBatchUpdate],
+    ) -> list[DishBatchResult]:
+        """Apply the changes with one UPDATE ... FROM unnest(...), a taken title fails the whole batch."""
+        # при повторе id применяется последнее изменение
+        rows = {item.id: item.dict() for item in items}
+        columns = [name for name in DishUpdate.__fields__]
+        try:
+            updated = await self.crud.update_many(Dish, submenu_id, list(rows.values()), columns)
+        except IntegrityError:
+            raise await self._batch_error(submenu_id, "failed to update dishes")
+        found = {row["id"] for row in updated}
+        await self._commit_batch(menu_id, submenu_id, 0, keys=[f"dish_{dish_id}" for dish_id in found])
+        return [
+            DishBatchResult(status="updated", id=str(item.id))
+            if item.id in found
+            else DishBatchResult(status="not_found", id=str(item.id))
+            for item in items
+        ]
+
+    async def delete_dishes(self, menu_id: int, submenu_id: int, ids: list[int]) -> list[DishBatchResult]:
+        """Delete the dishes of the submenu with one statement and shift the counters once."""
+        deleted = set(await self.crud.delete_many(Dish, submenu_id, ids))
+        await self._commit_batch(menu_id, submenu_id, -len(deleted), keys=[f"dish_{dish_id}" for dish_id in deleted])
+        return [
+            DishBatchResult(status="deleted" if dish_id in deleted else "not_found", id=str(dish_id)) for dish_id in ids
+        ]
+
+    async def _batch_error(self, submenu_id: int, detail: str) -> HTTPException:
+        await self.crud.rollback()
+        # внешний ключ на несуществующее подменю - 404, остальное - конфликт названия
+        if not await self.crud.get_from_db_by_id(SubMenu, submenu_id):
+            return HTTPException(
+                status_code=status.HTTP_404_NOT_FOUND,
+                detail="submenu not found",
+            )
+        return HTTPException(
+            status_code=status.HTTP_409_CONFLICT,
+            detail=detail,
+        )
+
+    async def _commit_batch(self, menu_id: int, submenu_id: int, delta: int, keys: list[str]) -> None:
+        # счетчики меняются одним UPDATE на меню и подменю на весь пакет, кеш - одним конвейером Redis
+        if not delta:
+            # счетчики не менялись - меню и подменю в кеше остаются верными
+            await self.crud.commit()
+            await self.cache.invalidate(keys=tuple(keys), tags=(f"dish_list_{submenu_id}",))
+            return
+        await self.crud.change_counters(Menu, menu_id, dishes_count=delta)
+        await self.crud.change_counters(SubMenu, submenu_id, dishes_count=delta)
+        await self.crud.commit()
+        await self.cache.invalidate(
+            keys=(*keys, f"menu_{menu_id}", f"submenu_{submenu_id}"),
+            tags=("menu_list", f"submenu_list_{menu_id}", f"dish_list_{submenu_id}"),
+        )
+
 
 @lru_cache
 def get_dish_service(
     db: AsyncSession = Depends(get_db),
-    cache=Depends(get_redis),
+    read_db: ReplicaReader | None = Depends(get_read_db),
+    cache: Cache = Depends(get_cache),
 ) -> DishService:
-    crud: CRUD = CRUD(db)
+    crud: CRUD = CRUD(db, read_db)
     return DishService(crud=crud, cache=cache)
@@ -1,86 +1,142 @@
-import json
 from dataclasses import dataclass
 from functools import lru_cache
 
-from fastapi import Depends, HTTPException, status
-from fastapi.encoders import jsonable_encoder
+from fastapi import Depends, HTTPException, Response, status
+from fastapi.responses import StreamingResponse
 from sqlalchemy.ext.asyncio import AsyncSession
 
-from src.api.v1.schemas.menu import MenuBase, MenuCreate, MenuResponse
-from src.db import Redis, get_db, get_redis
+from src.api.v1.schemas.menu import MenuCreate, MenuResponse, MenuUpdate
+from src.db import ReplicaReader, get_db, get_read_db
 from src.models import Menu
-from src.services import CRUD
+from src.services import (
+    CRUD,
+    Cache,
+    get_cache,
+    negative_key,
+    page_key,
+    render,
+    render_page,
+    render_stream,
+)
 
 __all__ = ("MenuService", "get_menu_service")
 
+# дерево меню -> подменю -> блюда собирается в Postgres одним запросом, id отдаются строками, как в API
+MENU_TREE_QUERY = """
+SELECT coalesce(json_agg(json_build_object(
+    'id', menu.id::text, 'title', menu.title, 'description', menu.description,
+    'submenus_count', menu.submenus_count, 'dishes_count', menu.dishes_count,
+    'submenus', coalesce((
+        SELECT json_agg(json_build_object(
+            'id', submenu.id::text, 'title', submenu.title, 'description', submenu.description,
+            'dishes_count', submenu.dishes_count,
+            'dishes', coalesce((
+                SELECT json_agg(json_build_object(
+                    'id', dish.id::text, 'title', dish.title, 'description', dish.description, 'price', dish.price::text
+                ) ORDER BY dish.id)
+                FROM dish WHERE dish.owner = submenu.id
+            ), '[]')
+        ) ORDER BY submenu.id)
+        FROM submenu WHERE submenu.owner = menu.id
+    ), '[]')
+) ORDER BY menu.id), '[]')::text
+FROM menu
+"""
+
 
 @dataclass
 class MenuService:
-    cache: Redis
+    cache: Cache
     crud: CRUD
 
-    async def get_menu_list(self) -> list[MenuResponse]:
-        if from_cache := await self.cache.get("menu_list"):
-            return json.loads(from_cache)
+    async def get_menu_list(
+        self,
+        after_id: int,
+        limit: int,
+        if_none_match: str | None = None,
+        stream: bool = False,
+    ) -> Response:
+        if stream:
+            rows = self.crud.stream_rows(Menu, None, after_id)
+            return StreamingResponse(
+                render_stream(MenuResponse(**row) async for row in rows),
+                media_type="application/json",
+            )
+        return await self.cache.respond(
+            page_key("menu_list", after_id, limit),
+            lambda: self._load_menu_page(after_id, limit),
+            tags=("menu_list",),
+            if_none_match=if_none_match,
+        )
 
-        data = await self.crud.get_all(Menu)
+    async def _load_menu_page(self, after_id: int, limit: int) -> tuple[bytes, dict[str, str]]:
+        data = await self.crud.get_page(Menu, None, after_id, limit + 1)
         menu_list: list[MenuResponse] = [
             MenuResponse(
                 **menu.to_dict(),
             )
             for menu in data
         ]
-        await self.cache.set("menu_list", json.dumps(jsonable_encoder(menu_list)), ex=60)
-        return menu_list
+        return render_page(menu_list, limit)
+
+    async def get_menu_tree(self, if_none_match: str | None = None) -> Response:
+        # ключ с версией каталога: любая запись делает его неактуальным, а старые ключи истекают сами
+        version = await self.cache.catalog_version()
+        return await self.cache.respond(
+            f"export_tree:{version}",
+            lambda: self.crud.get_json(MENU_TREE_QUERY),
+            if_none_match=if_none_match,
+        )
 
-    async def get_menu_by_id(self, menu_id: int) -> MenuResponse:
-        if from_cache := await self.cache.get(f"menu_{menu_id}"):
-            return MenuResponse(**json.loads(from_cache))
+    async def get_menu_by_id(self, menu_id: int, if_none_match: str | None = None) -> Response:
+        return await self.cache.respond(
+            f"menu_{menu_id}",
+            lambda: self._load_menu(menu_id),
+            if_none_match=if_none_match,
+        )
 
+    async def _load_menu(self, menu_id: int) -> bytes:
         menu: Menu = await self.crud.get_from_db_by_id(Menu, menu_id)
         if not menu:
             raise HTTPException(
                 status_code=status.HTTP_404_NOT_FOUND,
                 detail="menu not found",
             )
-        serialized_data: dict = menu.to_dict()
-        await self.cache.set(f"menu_{menu_id}", json.dumps(jsonable_encoder(serialized_data)), ex=60)
-        return MenuResponse(**serialized_data)
+        return render(MenuResponse(**menu.to_dict()))
 
     async def create_menu(self, new_menu: MenuCreate) -> MenuResponse:
-        menu: Menu = Menu(**new_menu.dict())
-        if await self.crud.get_from_db_by_title(Menu, new_menu.title):
+        menu: dict | None = await self.crud.insert_unique(Menu, new_menu.dict())
+        if menu is None:
             raise HTTPException(
                 status_code=status.HTTP_409_CONFLICT,
                 detail="failed to add menu",
             )
-        # await add_to_db(self.db, menu)
-        await self.crud.add_to_db(menu)
-        serialized_data: dict = menu.to_dict()
-        await self.cache.set(f"menu_{menu.id}", json.dumps(serialized_data), ex=300)
-        await self.cache.delete("menu_list")
-        return MenuResponse(**serialized_data)
-
-    async def update_menu(self, menu_id: int, updated_data: MenuBase) -> MenuResponse:
-        if not await self.crud.get_from_db_by_id(Menu, menu_id):
+        created = MenuResponse(**menu)
+        async with self.cache.writer() as writer:
+            writer.set(f"menu_{created.id}", render(created))
+            writer.invalidate(keys=(negative_key(f"menu_{created.id}"),), tags=("menu_list",))
+        return created
+
+    async def update_menu(self, menu_id: int, updated_data: MenuUpdate) -> MenuResponse:
+        updated: dict | None = await self.crud.update_data(menu_id, Menu, updated_data)
+        if updated is None:
             raise HTTPException(
                 status_code=status.HTTP_404_NOT_FOUND,
                 detail="menu not found",
             )
-        updated: dict = await self.crud.update_data(menu_id, Menu, updated_data)
-        await self.cache.delete(f"menu_{menu_id}")
-        await self.cache.delete("menu_list")
+        await self.cache.invalidate(keys=(f"menu_{menu_id}",), tags=("menu_list",))
         return MenuResponse(**updated)
 
     async def delete_menu(self, menu_id: int) -> dict:
-        menu: Menu = await self.crud.get_from_db_by_id(Menu, int(menu_id))
-        if not menu:
+        if not await self.crud.delete_by_id(Menu, int(menu_id)):
             raise HTTPException(
                 status_code=status.HTTP_404_NOT_FOUND,
                 detail="menu not found",
             )
-        await self.crud.delete_from_db(menu)
-        await self.cache.flushdb()
+        await self.cache.invalidate(
+            keys=(f"menu_{menu_id}",),
+            tags=(f"menu_{menu_id}", "menu_list"),
+        )
 
         return {"status": "true", "message": "The menu has been deleted"}
 
@@ -88,7 +144,8 @@ class MenuService:
 @lru_cache
 def get_menu_service(
     db: AsyncSession = Depends(get_db),
-    cache: Redis = Depends(get_redis),
+    read_db: ReplicaReader | None = Depends(get_read_db),
+    cache: Cache = Depends(get_cache),
 ) -> MenuService:
-    crud: CRUD = CRUD(db)
+    crud: CRUD = CRUD(db, read_db)
     return MenuService(crud=crud, cache=cache)
@@ -1,115 +1,139 @@
-import json
 from dataclasses import dataclass
 from functools import lru_cache
 
-from fastapi import Depends, HTTPException, status
-from fastapi.encoders import jsonable_encoder
+from fastapi import Depends, HTTPException, Response, status
+from fastapi.responses import StreamingResponse
+from sqlalchemy import select
 from sqlalchemy.ext.asyncio import AsyncSession
 
-from src.api.v1.schemas.submenu import SubMenuBase, SubMenuCreate, SubMenuResponse
-from src.db import Redis, get_db, get_redis
+from src.api.v1.schemas.submenu import SubMenuCreate, SubMenuResponse, SubMenuUpdate
+from src.db import ReplicaReader, get_db, get_read_db
 from src.models import Menu, SubMenu
-from src.services import CRUD
+from src.services import (
+    CRUD,
+    Cache,
+    Loaded,
+    get_cache,
+    negative_key,
+    page_key,
+    render,
+    render_page,
+    render_stream,
+)
 
 __all__ = ("SubMenuService", "get_submenu_service")
 
 
 @dataclass
 class SubMenuService:
-    cache: Redis
+    cache: Cache
     crud: CRUD
 
-    async def get_submenu_list(self) -> list[SubMenuResponse]:
-        if from_cache := await self.cache.get("submenu_list"):
-            return json.loads(from_cache)
-        data = await self.crud.get_all(SubMenu)
+    async def get_submenu_list(
+        self,
+        menu_id: int,
+        after_id: int,
+        limit: int,
+        if_none_match: str | None = None,
+        stream: bool = False,
+    ) -> Response:
+        if stream:
+            rows = self.crud.stream_rows(SubMenu, menu_id, after_id)
+            return StreamingResponse(
+                render_stream(SubMenuResponse(**row) async for row in rows),
+                media_type="application/json",
+            )
+        return await self.cache.respond(
+            page_key(f"submenu_list_{menu_id}", after_id, limit),
+            lambda: self._load_submenu_page(menu_id, after_id, limit),
+            tags=(f"submenu_list_{menu_id}", f"menu_{menu_id}"),
+            if_none_match=if_none_match,
+        )
+
+    async def _load_submenu_page(self, menu_id: int, after_id: int, limit: int) -> tuple[bytes, dict[str, str]]:
+        data = await self.crud.get_page(SubMenu, menu_id, after_id, limit + 1)
         submenu_list: list[SubMenuResponse] = [SubMenuResponse(**submenu.to_dict()) for submenu in data]
-        await self.cache.set("submenu_list", json.dumps(jsonable_encoder(submenu_list)), ex=60)
-        return submenu_list
+        return render_page(submenu_list, limit)
 
-    async def get_submenu_by_id(self, submenu_id: int) -> SubMenuResponse:
-        if from_cache := await self.cache.get(f"submenu_{submenu_id}"):
-            return SubMenuResponse(**json.loads(from_cache))
+    async def get_submenu_by_id(self, menu_id: int, submenu_id: int, if_none_match: str | None = None) -> Response:
+        # тег меню берется из строки, а не из пути: menu_id в URL может быть чужим
+        return await self.cache.respond(
+            f"submenu_{submenu_id}",
+            lambda: self._load_submenu(submenu_id),
+            if_none_match=if_none_match,
+        )
 
+    async def _load_submenu(self, submenu_id: int) -> Loaded:
         submenu: SubMenu = await self.crud.get_from_db_by_id(SubMenu, submenu_id)
         if not submenu:
             raise HTTPException(
                 status_code=status.HTTP_404_NOT_FOUND,
                 detail="submenu not found",
             )
-        serialized_data: dict = submenu.to_dict()
-        await self.cache.set(
-            f"submenu_{submenu_id}",
-            json.dumps(jsonable_encoder(serialized_data)),
-            ex=60,
-        )
-        return SubMenuResponse(**serialized_data)
+        return Loaded(render(SubMenuResponse(**submenu.to_dict())), tags=(f"menu_{submenu.owner}",))
 
     async def create_submenu(
         self,
         menu_id: int,
         new_submenu: SubMenuCreate,
     ) -> SubMenuResponse:
-        submenu: SubMenu = SubMenu(**new_submenu.dict())
-        submenu.owner = menu_id
-
-        if await self.crud.get_from_db_by_title(SubMenu, new_submenu.title):
+        # счетчик меняется до вставки, чтобы строки блокировались в порядке меню -> подменю;
+        # при конфликте названия insert_unique откатывает и его
+        await self.crud.change_counters(Menu, menu_id, submenus_count=1)
+        submenu: dict | None = await self.crud.insert_unique(SubMenu, {**new_submenu.dict(), "owner": menu_id})
+        if submenu is None:
             raise HTTPException(
                 status_code=status.HTTP_409_CONFLICT,
                 detail="failed to add submenu",
             )
-        menu: Menu = await self.crud.get_from_db_by_id(Menu, menu_id)
-        menu.submenus_count += 1
-        await self.crud.add_to_db(submenu)
-        serialized_data: dict = submenu.to_dict()
-        await self.cache.set(
-            f"submenu_{submenu.id}",
-            json.dumps(serialized_data),
-            ex=60,
-        )
-        await self.cache.delete(f"menu_{menu_id}")
-        await self.cache.delete("menu_list")
-        await self.cache.delete("submenu_list")
-        return SubMenuResponse(**serialized_data)
+        created = SubMenuResponse(**submenu)
+        async with self.cache.writer() as writer:
+            writer.set(
+                f"submenu_{created.id}",
+                render(created),
+                tags=(f"menu_{menu_id}",),
+            )
+            writer.invalidate(
+                keys=(negative_key(f"submenu_{created.id}"), f"menu_{menu_id}"),
+                tags=("menu_list", f"submenu_list_{menu_id}"),
+            )
+        return created
 
     async def update_submenu(
         self,
         submenu_id: int,
-        updated_data: SubMenuBase,
+        updated_data: SubMenuUpdate,
     ) -> SubMenuResponse:
-        if not await self.crud.get_from_db_by_id(SubMenu, submenu_id):
+        updated: dict | None = await self.crud.update_data(submenu_id, SubMenu, updated_data)
+        if updated is None:
             raise HTTPException(
                 status_code=status.HTTP_404_NOT_FOUND,
                 detail="submenu not found",
             )
-        updated: dict = await self.crud.update_data(submenu_id, SubMenu, updated_data)
-        await self.cache.delete(f"submenu_{submenu_id}")
-        await self.cache.delete("submenu_list")
+        await self.cache.invalidate(keys=(f"submenu_{submenu_id}",), tags=(f"submenu_list_{updated['owner']}",))
         return SubMenuResponse(**updated)
 
     async def delete_submenu(self, menu_id: int, submenu_id: int) -> dict:
-        to_del: SubMenu = await self.crud.get_from_db_by_id(SubMenu, submenu_id)
-        if not to_del:
+        # число блюд берется из БД в момент UPDATE; если подменю нет, delete_by_id откатит и счетчики
+        dishes_count = select(SubMenu.dishes_count).where(SubMenu.id == submenu_id).scalar_subquery()
+        await self.crud.change_counters(Menu, menu_id, submenus_count=-1, dishes_count=-dishes_count)
+        if not await self.crud.delete_by_id(SubMenu, submenu_id):
             raise HTTPException(
                 status_code=status.HTTP_404_NOT_FOUND,
                 detail="submenu not found",
             )
-        menu: Menu = await self.crud.get_from_db_by_id(Menu, menu_id)
-        menu.submenus_count -= 1
-        menu.dishes_count -= to_del.dishes_count
-        await self.crud.delete_from_db(to_del)
-        await self.cache.delete(f"submenu_{submenu_id}")
-        await self.cache.delete(f"menu_{menu_id}")
-        await self.cache.delete("menu_list")
-        await self.cache.delete("submenu_list")
-        await self.cache.delete("dish_list")
+        await self.cache.invalidate(
+            keys=(f"submenu_{submenu_id}", f"menu_{menu_id}"),
+            tags=(f"submenu_{submenu_id}", "menu_list", f"submenu_list_{menu_id}"),
+        )
         return {"status": "true", "message": "The submenu has been deleted"}
 
 
 @lru_cache
 def get_submenu_service(
     db: AsyncSession = Depends(get_db),
-    cache=Depends(get_redis),
+    read_db: ReplicaReader | None = Depends(get_read_db),
+    cache: Cache = Depends(get_cache),
 ) -> SubMenuService:
-    crud: CRUD = CRUD(db)
+    crud: CRUD = CRUD(db, read_db)
     return SubMenuService(crud=crud, cache=cache)
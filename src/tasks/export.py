@@ -0,0 +1,57 @@
+import logging
+from collections.abc import Iterable, Iterator, Sequence
+from contextlib import closing
+
+import psycopg2
+
+from src.core import config
+
+logger = logging.getLogger(__name__)
+
+FULL_MENU_QUERY = """SELECT menu.id, menu.title, menu.description, submenu.id as sb_id,
+                     submenu.title as sb_title, submenu.description as sb_description, dish.id as dsh_id,
+                     dish.title as dsh_title, dish.description as dsh_description, dish.price::text as price
+                     FROM menu JOIN submenu ON submenu.owner = menu.id JOIN dish ON dish.owner = submenu.id
+                     ORDER BY menu.id, submenu.id, dish.id"""
+# пустая ячейка на месте повторяющегося значения
+BLANK = [""]
+
+
+def _dsn(url: str) -> str:
+    return url.replace("postgresql+asyncpg://", "postgresql://", 1)
+
+
+def connect():
+    # выгрузка только читает, поэтому идет в реплику, если она есть; недоступная реплика - в основную БД
+    if config.REPLICA_DATABASE_URL:
+        try:
+            return psycopg2.connect(
+                _dsn(config.REPLICA_DATABASE_URL),
+                connect_timeout=max(int(config.DB_REPLICA_CONNECT_TIMEOUT), 1),
+            )
+        except psycopg2.OperationalError:
+            logger.warning("Read replica is unavailable, exporting from the primary", exc_info=True)
+    return psycopg2.connect(_dsn(config.DATABASE_URL))
+
+
+def fetch_rows(query: str) -> Iterator[tuple]:
+    """Rows of the query read through a server-side cursor, EXPORT_FETCH_SIZE rows per round trip."""
+    with closing(connect()) as connection:
+        # именованный курсор - серверный: строки приходят пачками, а не все сразу
+        with connection.cursor(name="export") as cursor:
+            cursor.itersize = config.EXPORT_FETCH_SIZE
+            cursor.execute(query)
+            yield from cursor
+
+
+def make_excel_file(rows: Iterable[Sequence]) -> Iterator[list]:
+    """Display rows: menu and submenu columns stay empty while they repeat the row above."""
+    # один проход, помнит только id предыдущей строки: строки идут по меню, подменю и блюду (см. FULL_MENU_QUERY)
+    previous_menu = previous_submenu = None
+    for row in rows:
+        menu, submenu, dish = row[:3], row[3:6], row[6:]
+        display = list(menu) if menu[0] != previous_menu else BLANK * len(menu)
+        display += list(submenu) if submenu[0] != previous_submenu else BLANK * len(submenu)
+        display += dish
+        previous_menu, previous_submenu = menu[0], submenu[0]
+        yield display
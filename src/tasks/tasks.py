@@ -1,23 +1,37 @@
 import os
+from collections.abc import Iterable, Sequence
 
 from celery.result import AsyncResult
-from openpyxl.workbook import Workbook
+from xlsxwriter import Workbook
 
 from src.core import config
 from src.tasks import celery
+from src.tasks.export import FULL_MENU_QUERY, fetch_rows, make_excel_file
+
+
+def write_xlsx(path: str, rows: Iterable[Sequence]) -> int:
+    """Write the rows to a one-sheet xlsx file in constant memory, return the number of rows."""
+    # XlsxWriter сбрасывает строку во временный файл, как только начата следующая: строки пишутся по порядку
+    workbook = Workbook(path, {"constant_memory": True})
+    worksheet = workbook.add_worksheet("Меню")
+    count = 0
+    for count, row in enumerate(rows, start=1):
+        worksheet.write_row(count - 1, 0, row)
+    workbook.close()
+    return count
+
+
+def export_full_menu(path: str) -> int:
+    """Read the whole menu from the database and write it to an xlsx file."""
+    return write_xlsx(path, make_excel_file(fetch_rows(FULL_MENU_QUERY)))
 
 
 @celery.task  # type: ignore
-def create_task(data):
+def create_task():
+    # данные задача читает из БД сама, в сообщение брокера попадает только вызов
     task_id = celery.current_task.request.id  # type: ignore
     filename = f"{task_id}.xlsx"
-    wb = Workbook()
-    ws = wb.active
-    ws.title = "Меню"
-    for i, row in enumerate(data):
-        for j, el in enumerate(row):
-            ws.cell(i + 1, j + 1, el)
-    wb.save(os.path.join(config.BASE_DIR, filename))
+    export_full_menu(os.path.join(config.BASE_DIR, filename))
     return task_id
 
 
@@ -0,0 +1,51 @@
+import pytest
+from fastapi import status
+
+from src.core import config
+from src.db import get_redis
+from src.services import Cache
+
+
+class TestAdmin:
+    @pytest.mark.asyncio
+    async def test_redis_pool_stats(self, test_app):
+        await test_app.get("/api/v1/menus")
+        response = await test_app.get("/api/v1/admin/redis")
+        assert response.status_code == status.HTTP_200_OK
+        stats = response.json()
+        assert stats["created"] >= 1
+        assert stats["in_use"] + stats["idle"] == stats["created"]
+        assert stats["created"] <= stats["max_connections"]
+        assert stats["acquired"] >= 1
+
+    @pytest.mark.asyncio
+    async def test_db_engine_stats(self, test_app):
+        await test_app.get("/api/v1/menus/1")
+        response = await test_app.get("/api/v1/admin/db")
+        assert response.status_code == status.HTTP_200_OK
+        stats = response.json()
+        assert stats["profile"] == config.DB_ENGINE_PROFILE
+        assert stats["settings"]["pool_size"] == stats["pool_size"]
+        assert stats["checked_in"] >= 1
+
+    @pytest.mark.asyncio
+    async def test_cache_stats(self, test_app):
+        response = await test_app.post("/api/v1/menus", json={"title": "Stats menu", "description": "d"})
+        menu_id = response.json()["id"]
+        await test_app.get(f"/api/v1/menus/{menu_id}")
+        await test_app.get(f"/api/v1/menus/{menu_id}")
+        response = await test_app.get("/api/v1/admin/cache")
+        assert response.status_code == status.HTTP_200_OK
+        stats = response.json()
+        assert stats["l1_hits"] >= 2
+        assert 0 < stats["l1_hit_ratio"] <= 1
+        detail = stats["families"]["detail"]
+        assert detail["hits"] >= 2
+        assert detail["avg_payload_bytes"] > 0
+        await test_app.delete(f"/api/v1/menus/{menu_id}")
+        evictions = (await test_app.get("/api/v1/admin/cache")).json()["families"]["detail"]["evictions"]
+        assert evictions >= 1
+        # повторный сброс уже удаленного ключа вытеснением не считается
+        await Cache(redis=await get_redis()).invalidate(keys=(f"menu_{menu_id}",))
+        stats = (await test_app.get("/api/v1/admin/cache")).json()
+        assert stats["families"]["detail"]["evictions"] == evictions
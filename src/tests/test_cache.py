@@ -0,0 +1,233 @@
+import asyncio
+
+import pytest
+from fastapi import status
+from sqlalchemy import event
+
+from src.db import engine, get_redis
+from src.services import Cache, CachePolicy, local_cache, negative_key
+
+
+class TestCacheInvalidation:
+    @pytest.mark.asyncio
+    async def test_delete_menu_evicts_only_its_subtree(self, test_app):
+        redis = await get_redis()
+        menu_ids = []
+        for title in ("Cache menu 1", "Cache menu 2"):
+            response = await test_app.post("/api/v1/menus", json={"title": title, "description": "d"})
+            menu_ids.append(response.json()["id"])
+        kept_id, deleted_id = menu_ids
+        response = await test_app.post(
+            f"/api/v1/menus/{deleted_id}/submenus",
+            json={"title": "Cache submenu", "description": "d"},
+        )
+        submenu_id = response.json()["id"]
+        response = await test_app.post(
+            f"/api/v1/menus/{deleted_id}/submenus/{submenu_id}/dishes",
+            json={"title": "Cache dish", "description": "d", "price": "1.00"},
+        )
+        dish_id = response.json()["id"]
+        await test_app.get(f"/api/v1/menus/{kept_id}")
+        await test_app.get(f"/api/v1/menus/{deleted_id}/submenus/{submenu_id}")
+        await test_app.get(f"/api/v1/menus/{deleted_id}/submenus/{submenu_id}/dishes/{dish_id}")
+
+        response = await test_app.delete(f"/api/v1/menus/{deleted_id}")
+        assert response.status_code == status.HTTP_200_OK
+        assert await redis.exists(f"menu_{kept_id}")
+        assert not await redis.exists(f"menu_{deleted_id}", f"submenu_{submenu_id}", f"dish_{dish_id}")
+        response = await test_app.get(f"/api/v1/menus/{deleted_id}/submenus/{submenu_id}/dishes/{dish_id}")
+        assert response.status_code == status.HTTP_404_NOT_FOUND
+        await test_app.delete(f"/api/v1/menus/{kept_id}")
+
+    @pytest.mark.asyncio
+    async def test_detail_tags_follow_real_owner(self, test_app):
+        redis = await get_redis()
+        response = await test_app.post("/api/v1/menus", json={"title": "Owner menu", "description": "d"})
+        menu_id = response.json()["id"]
+        response = await test_app.post(
+            f"/api/v1/menus/{menu_id}/submenus",
+            json={"title": "Owner submenu", "description": "d"},
+        )
+        submenu_id = response.json()["id"]
+        response = await test_app.post(
+            f"/api/v1/menus/{menu_id}/submenus/{submenu_id}/dishes",
+            json={"title": "Owner dish", "description": "d", "price": "1.00"},
+        )
+        dish_id = response.json()["id"]
+        await Cache(redis=redis).invalidate(keys=(f"submenu_{submenu_id}", f"dish_{dish_id}"))
+        # детали загружаются по пути с чужими id родителей
+        response = await test_app.get(f"/api/v1/menus/910101/submenus/{submenu_id}")
+        assert response.status_code == status.HTTP_200_OK
+        response = await test_app.get(f"/api/v1/menus/910101/submenus/910102/dishes/{dish_id}")
+        assert response.status_code == status.HTTP_200_OK
+        response = await test_app.get(f"/api/v1/menus/910101/submenus/{submenu_id}/dishes")
+        assert [dish["id"] for dish in response.json()] == [dish_id]
+
+        await test_app.delete(f"/api/v1/menus/{menu_id}")
+        assert not await redis.exists(f"submenu_{submenu_id}", f"dish_{dish_id}")
+        response = await test_app.get(f"/api/v1/menus/910101/submenus/{submenu_id}")
+        assert response.status_code == status.HTTP_404_NOT_FOUND
+        response = await test_app.get(f"/api/v1/menus/910101/submenus/{submenu_id}/dishes")
+        assert response.json() == []
+
+
+class TestCacheStampede:
+    @pytest.mark.asyncio
+    async def test_concurrent_misses_query_db_once(self, test_app):
+        response = await test_app.post("/api/v1/menus", json={"title": "Stampede menu", "description": "d"})
+        menu_id = response.json()["id"]
+        await Cache(redis=await get_redis()).invalidate(tags=("menu_list",))
+
+        statements = []
+
+        def count_menu_selects(conn, cursor, statement, *args):
+            if statement.lstrip().startswith("SELECT") and "FROM menu" in statement:
+                statements.append(statement)
+
+        event.listen(engine.sync_engine, "before_cursor_execute", count_menu_selects)
+        try:
+            responses = await asyncio.gather(*(test_app.get("/api/v1/menus") for _ in range(20)))
+        finally:
+            event.remove(engine.sync_engine, "before_cursor_execute", count_menu_selects)
+        assert all(response.status_code == status.HTTP_200_OK for response in responses)
+        assert all(response.json() == responses[0].json() for response in responses)
+        assert len(statements) == 1
+        await test_app.delete(f"/api/v1/menus/{menu_id}")
+
+
+class TestNegativeCache:
+    @pytest.mark.asyncio
+    async def test_not_found_is_cached_until_created(self, test_app):
+        response = await test_app.post("/api/v1/menus", json={"title": "Negative menu", "description": "d"})
+        menu_id = response.json()["id"]
+        url = f"/api/v1/menus/{menu_id}/submenus"
+        response = await test_app.post(url, json={"title": "Negative submenu 1", "description": "d"})
+        next_id = str(int(response.json()["id"]) + 1)
+
+        statements = []
+
+        def count_submenu_selects(conn, cursor, statement, *args):
+            if statement.lstrip().startswith("SELECT") and "FROM submenu" in statement:
+                statements.append(statement)
+
+        event.listen(engine.sync_engine, "before_cursor_execute", count_submenu_selects)
+        try:
+            for _ in range(3):
+                response = await test_app.get(f"{url}/{next_id}")
+                assert response.status_code == status.HTTP_404_NOT_FOUND
+                assert response.json() == {"detail": "submenu not found"}
+                local_cache.clear()
+        finally:
+            event.remove(engine.sync_engine, "before_cursor_execute", count_submenu_selects)
+        assert len(statements) == 1
+        assert await (await get_redis()).exists(negative_key(f"submenu_{next_id}"))
+
+        response = await test_app.post(url, json={"title": "Negative submenu 2", "description": "d"})
+        assert response.json()["id"] == next_id
+        response = await test_app.get(f"{url}/{next_id}")
+        assert response.status_code == status.HTTP_200_OK
+        await test_app.delete(f"/api/v1/menus/{menu_id}")
+
+
+class TestConditionalGet:
+    @pytest.mark.asyncio
+    async def test_etag_changes_only_on_update(self, test_app):
+        response = await test_app.post("/api/v1/menus", json={"title": "ETag menu", "description": "d"})
+        menu_id = response.json()["id"]
+        response = await test_app.get(f"/api/v1/menus/{menu_id}")
+        etag = response.headers["etag"]
+        assert response.json()["title"] == "ETag menu"
+
+        for cached in (True, False):
+            if not cached:
+                local_cache.pop(f"menu_{menu_id}")
+            response = await test_app.get(f"/api/v1/menus/{menu_id}", headers={"If-None-Match": etag})
+            assert response.status_code == status.HTTP_304_NOT_MODIFIED
+            assert response.headers["etag"] == etag
+            assert response.content == b""
+
+        await test_app.patch(f"/api/v1/menus/{menu_id}", json={"title": "ETag menu 2", "description": "d"})
+        response = await test_app.get(f"/api/v1/menus/{menu_id}", headers={"If-None-Match": etag})
+        assert response.status_code == status.HTTP_200_OK
+        assert response.headers["etag"] != etag
+        assert response.json()["title"] == "ETag menu 2"
+        await test_app.delete(f"/api/v1/menus/{menu_id}")
+
+    @pytest.mark.asyncio
+    async def test_list_etag_changes_on_create(self, test_app):
+        response = await test_app.get("/api/v1/menus")
+        etag = response.headers["etag"]
+        response = await test_app.get("/api/v1/menus", headers={"If-None-Match": f'W/{etag}, "0"'})
+        assert response.status_code == status.HTTP_304_NOT_MODIFIED
+
+        response = await test_app.post("/api/v1/menus", json={"title": "ETag list menu", "description": "d"})
+        menu_id = response.json()["id"]
+        response = await test_app.get("/api/v1/menus", headers={"If-None-Match": etag})
+        assert response.status_code == status.HTTP_200_OK
+        assert response.headers["etag"] != etag
+        await test_app.delete(f"/api/v1/menus/{menu_id}")
+
+    @pytest.mark.asyncio
+    async def test_fill_racing_a_write_is_not_cached(self):
+        cache = Cache(redis=await get_redis())
+        await cache.set("race_key", b'"v1"')
+        etag = (await cache.get_or_set("race_key", self.fail)).etag
+        await cache.invalidate(keys=("race_key",))
+
+        async def load_then_write() -> bytes:
+            # загрузка прочитала старую строку, а запись успела закоммититься и сбросить ключ
+            await cache.invalidate(keys=("race_key",))
+            return b'"old"'
+
+        stale = await cache.get_or_set("race_key", load_then_write)
+        assert (stale.body, stale.version) == (b'"old"', None)
+        assert not await cache.redis.exists("race_key")
+
+        async def load_new() -> bytes:
+            return b'"new"'
+
+        fresh = await cache.get_or_set("race_key", load_new)
+        assert fresh.body == b'"new"'
+        assert fresh.etag != etag
+        assert (await cache.get_or_set("race_key", self.fail, if_none_match=fresh.etag)).body is None
+        await cache.invalidate(keys=("race_key",))
+
+    @staticmethod
+    async def fail() -> bytes:
+        raise AssertionError("the value must come from the cache")
+
+
+class TestCacheWriter:
+    @pytest.mark.asyncio
+    async def test_flush_applies_invalidations_before_writes(self):
+        cache = Cache(redis=await get_redis())
+        await cache.set("writer_old", b"[1]", tags=("writer_tag",))
+        async with cache.writer() as writer:
+            writer.invalidate(keys=("writer_new",), tags=("writer_tag",))
+            writer.set("writer_new", b"[2]")
+            assert await cache.redis.exists("writer_old")
+        assert not await cache.redis.exists("writer_old")
+        assert await cache.get("writer_new") == b"[2]"
+        await cache.invalidate(keys=("writer_new",))
+
+    @pytest.mark.asyncio
+    async def test_nothing_is_written_on_error(self):
+        cache = Cache(redis=await get_redis())
+        with pytest.raises(RuntimeError):
+            async with cache.writer() as writer:
+                writer.set("writer_failed", b"[]")
+                raise RuntimeError
+        assert await cache.get("writer_failed") is None
+
+
+class TestCachePolicy:
+    def test_family_by_key(self):
+        assert CachePolicy.family("menu_1") == CachePolicy.DETAIL
+        assert CachePolicy.family("dish_list") == CachePolicy.LIST
+        assert CachePolicy.family("neg:menu_1") == CachePolicy.NEGATIVE
+
+    def test_ttl_jitter(self):
+        policy = CachePolicy(ttls={CachePolicy.DETAIL: 100}, jitter=0.1)
+        ttls = {policy.ttl("menu_1") for _ in range(200)}
+        assert all(90 <= ttl <= 110 for ttl in ttls)
+        assert len(ttls) > 1
@@ -1,6 +1,11 @@
+import asyncio
+
 import pytest
 import pytest_asyncio
 from fastapi import status
+from sqlalchemy import text
+
+from src.db import engine, get_redis
 
 menu_id = 0
 submenu_id = 0
@@ -101,7 +106,7 @@ class TestDishes:
         assert response.status_code == status.HTTP_200_OK
         assert response.json()["title"] == test_updated_dish["title"]
         assert response.json()["description"] == test_updated_dish["description"]
-        assert response.json()["price"] == test_updated_dish["price"]
+        assert response.json()["price"] == "333.00"
 
     @pytest.mark.asyncio
     async def test_patch_dish_by_incorrect_id(self, test_app):
@@ -135,3 +140,172 @@ class TestDishes:
         )
         assert response.status_code == status.HTTP_404_NOT_FOUND
         assert response.json() == {"detail": "dish not found"}
+
+
+class TestDishCounters:
+    @pytest.mark.asyncio
+    async def test_counters_stay_exact_under_parallel_writers(self, test_app):
+        response = await test_app.post("/api/v1/menus", json={"title": "Counter menu", "description": "d"})
+        menu_id = response.json()["id"]
+        url = f"/api/v1/menus/{menu_id}/submenus"
+        submenu_ids = []
+        for title in ("Counter submenu 1", "Counter submenu 2"):
+            response = await test_app.post(url, json={"title": title, "description": "d"})
+            submenu_ids.append(response.json()["id"])
+
+        responses = await asyncio.gather(
+            *(
+                test_app.post(
+                    f"{url}/{submenu_ids[i % 2]}/dishes",
+                    json={"title": f"Counter dish {i}", "description": "d", "price": "1.00"},
+                )
+                for i in range(10)
+            ),
+        )
+        assert all(response.status_code == status.HTTP_201_CREATED for response in responses)
+        dishes = [(submenu_ids[i % 2], response.json()["id"]) for i, response in enumerate(responses)]
+        await asyncio.gather(
+            *(test_app.delete(f"{url}/{owner}/dishes/{dish_id}") for owner, dish_id in dishes[:4]),
+        )
+
+        response = await test_app.get(f"/api/v1/menus/{menu_id}")
+        assert response.json()["submenus_count"] == 2
+        assert response.json()["dishes_count"] == 6
+        for submenu_id in submenu_ids:
+            response = await test_app.get(f"{url}/{submenu_id}")
+            assert response.json()["dishes_count"] == 3
+
+        await test_app.delete(f"{url}/{submenu_ids[0]}")
+        response = await test_app.get(f"/api/v1/menus/{menu_id}")
+        assert response.json()["submenus_count"] == 1
+        assert response.json()["dishes_count"] == 3
+        await test_app.delete(f"/api/v1/menus/{menu_id}")
+
+
+class TestDishPrice:
+    @pytest.mark.asyncio
+    async def test_price_filter_and_sort(self, test_app):
+        response = await test_app.post("/api/v1/menus", json={"title": "Price menu", "description": "d"})
+        menu_id = response.json()["id"]
+        response = await test_app.post(
+            f"/api/v1/menus/{menu_id}/submenus",
+            json={"title": "Price submenu", "description": "d"},
+        )
+        url = f"/api/v1/menus/{menu_id}/submenus/{response.json()['id']}/dishes"
+        for title, price in (("Price A", "30"), ("Price B", "9.999"), ("Price C", "20.5"), ("Price D", "9.99")):
+            response = await test_app.post(url, json={"title": title, "description": "d", "price": price})
+            assert response.status_code == status.HTTP_201_CREATED
+        response = await test_app.post(url, json={"title": "Price E", "description": "d", "price": "abc"})
+        assert response.status_code == status.HTTP_422_UNPROCESSABLE_ENTITY
+
+        response = await test_app.get(url, params={"sort": "price", "limit": 3})
+        assert [dish["title"] for dish in response.json()] == ["Price B", "Price D", "Price C"]
+        assert [dish["price"] for dish in response.json()] == ["9.99", "9.99", "20.50"]
+        # курсор - цена:id, по нему продолжается порядок по цене
+        cursor = response.headers["X-Next-Cursor"]
+        assert cursor.startswith("20.50:")
+        response = await test_app.get(url, params={"sort": "price", "after_id": cursor})
+        assert [dish["title"] for dish in response.json()] == ["Price A"]
+        assert "X-Next-Cursor" not in response.headers
+        response = await test_app.get(url, params={"sort": "price", "after_id": cursor.split(":")[1]})
+        assert response.status_code == status.HTTP_400_BAD_REQUEST
+
+        response = await test_app.get(url, params={"min_price": "10", "max_price": "30"})
+        assert [dish["title"] for dish in response.json()] == ["Price A", "Price C"]
+        response = await test_app.get(url, params={"min_price": "10", "max_price": "30", "stream": "true"})
+        assert [dish["title"] for dish in response.json()] == ["Price A", "Price C"]
+        response = await test_app.get(url)
+        assert len(response.json()) == 4
+        await test_app.delete(f"/api/v1/menus/{menu_id}")
+
+    @pytest.mark.asyncio
+    async def test_price_cursor_survives_changes(self, test_app):
+        response = await test_app.post("/api/v1/menus", json={"title": "Cursor menu", "description": "d"})
+        menu_id = response.json()["id"]
+        response = await test_app.post(
+            f"/api/v1/menus/{menu_id}/submenus",
+            json={"title": "Cursor submenu", "description": "d"},
+        )
+        url = f"/api/v1/menus/{menu_id}/submenus/{response.json()['id']}/dishes"
+        ids = {}
+        for title, price in (("Cursor A", "1"), ("Cursor B", "2"), ("Cursor C", "3"), ("Cursor D", "4")):
+            response = await test_app.post(url, json={"title": title, "description": "d", "price": price})
+            ids[title] = int(response.json()["id"])
+        # цена, которую не удалось разобрать при переходе на NUMERIC
+        async with engine.begin() as connection:
+            await connection.execute(text("UPDATE dish SET price = NULL WHERE id = :id"), {"id": ids["Cursor A"]})
+
+        response = await test_app.get(url, params={"sort": "price", "limit": 1})
+        assert [dish["title"] for dish in response.json()] == ["Cursor B"]
+        cursor = response.headers["X-Next-Cursor"]
+        # строка курсора удалена - страница продолжается с той же позиции
+        await test_app.delete(f"{url}/{ids['Cursor B']}")
+        response = await test_app.get(url, params={"sort": "price", "limit": 2, "after_id": cursor})
+        assert [dish["title"] for dish in response.json()] == ["Cursor C", "Cursor D"]
+        response = await test_app.get(
+            url,
+            params={"sort": "price", "limit": 2, "after_id": response.headers["X-Next-Cursor"]},
+        )
+        assert [dish["title"] for dish in response.json()] == ["Cursor A"]
+        assert response.json()[0]["price"] is None
+        response = await test_app.get(url, params={"sort": "price", "limit": 1, "after_id": f":{ids['Cursor A']}"})
+        assert response.json() == []
+        response = await test_app.get(
+            url,
+            params={"sort": "price", "stream": "true", "after_id": f"3.00:{ids['Cursor C']}"},
+        )
+        assert [dish["title"] for dish in response.json()] == ["Cursor D", "Cursor A"]
+        await test_app.delete(f"/api/v1/menus/{menu_id}")
+
+
+class TestDishBatch:
+    @pytest.mark.asyncio
+    async def test_batch_create_update_delete(self, test_app):
+        response = await test_app.post("/api/v1/menus", json={"title": "Batch menu", "description": "d"})
+        menu_id = response.json()["id"]
+        response = await test_app.post(
+            f"/api/v1/menus/{menu_id}/submenus",
+            json={"title": "Batch submenu", "description": "d"},
+        )
+        submenu_id = response.json()["id"]
+        url = f"/api/v1/menus/{menu_id}/submenus/{submenu_id}/dishes"
+        await test_app.post(url, json={"title": "Batch taken", "description": "d", "price": "1"})
+
+        batch = [
+            {"title": title, "description": "d", "price": "2.5"} for title in ("Batch 1", "Batch taken", "Batch 2")
+        ]
+        response = await test_app.post(f"{url}/batch", json=[*batch, batch[0]])
+        assert response.status_code == status.HTTP_200_OK
+        results = response.json()
+        assert [result["status"] for result in results] == ["created", "conflict", "created", "conflict"]
+        first_id, second_id = results[0]["id"], results[2]["id"]
+        response = await test_app.get(f"/api/v1/menus/{menu_id}/submenus/{submenu_id}")
+        assert response.json()["dishes_count"] == 3
+
+        assert (await test_app.get(f"{url}/{first_id}")).json()["price"] == "2.50"
+        response = await test_app.patch(
+            f"{url}/batch",
+            json=[{"id": first_id, "price": "7.777"}, {"id": 999999, "title": "Batch missing"}],
+        )
+        assert [result["status"] for result in response.json()] == ["updated", "not_found"]
+        # счетчики не менялись - подменю остается в кеше
+        assert await (await get_redis()).exists(f"submenu_{submenu_id}")
+        response = await test_app.get(f"{url}/{first_id}")
+        assert (response.json()["title"], response.json()["price"]) == ("Batch 1", "7.77")
+        response = await test_app.patch(f"{url}/batch", json=[{"id": first_id, "title": "Batch taken"}])
+        assert response.status_code == status.HTTP_409_CONFLICT
+
+        response = await test_app.request("DELETE", f"{url}/batch", json=[int(first_id), int(second_id), 999999])
+        assert [result["status"] for result in response.json()] == ["deleted", "deleted", "not_found"]
+        assert (await test_app.get(f"{url}/{first_id}")).status_code == status.HTTP_404_NOT_FOUND
+        response = await test_app.get(f"/api/v1/menus/{menu_id}")
+        assert (response.json()["submenus_count"], response.json()["dishes_count"]) == (1, 1)
+
+        response = await test_app.post(f"{url}/batch", json=[])
+        assert response.status_code == status.HTTP_422_UNPROCESSABLE_ENTITY
+        await test_app.delete(f"/api/v1/menus/{menu_id}")
+
+        # подменю удалено вместе с меню - внешний ключ не дает вставить блюда
+        response = await test_app.post(f"{url}/batch", json=[{"title": "Batch 3", "description": "d", "price": "1"}])
+        assert response.status_code == status.HTTP_404_NOT_FOUND
+        assert response.json() == {"detail": "submenu not found"}
@@ -0,0 +1,121 @@
+import orjson
+import pytest
+from fastapi import status
+
+from src.core import config
+from src.db import async_session, get_redis
+from src.services import CRUD, Cache, warm_up_cache
+
+
+class TestFullMenu:
+    @pytest.mark.asyncio
+    async def test_create_full_menu_warms_up_cache(self, test_app):
+        response = await test_app.get("/api/v1/create_full_menu")
+        assert response.status_code == status.HTTP_200_OK
+        warmup = response.json()["cache_warmup"]
+        # первые страницы 6 списков подменю и блюд, 2 меню, 4 подменю и 11 блюд; список меню только сбрасывается
+        assert warmup["complete"]
+        assert warmup["keys"] >= 23
+
+        redis = await get_redis()
+        menus = (await test_app.get("/api/v1/menus")).json()
+        assert {menu["title"] for menu in menus} >= {"Еда", "Алкоголь"}
+        for menu in menus:
+            assert await redis.exists(f"menu_{menu['id']}")
+            await test_app.delete(f"/api/v1/menus/{menu['id']}")
+
+    @pytest.mark.asyncio
+    async def test_warm_up_stops_on_memory_budget(self, test_app, monkeypatch):
+        await test_app.get("/api/v1/create_full_menu")
+        menus = (await test_app.get("/api/v1/menus")).json()
+        # хватает только на одну запись размером с меню
+        monkeypatch.setattr(config, "CACHE_WARMUP_MEMORY_BUDGET", len(orjson.dumps(menus[0])) + 8)
+        async with async_session() as db:
+            report = await warm_up_cache(CRUD(db), Cache(redis=await get_redis()))
+        assert not report["complete"]
+        assert report["keys"] == 1
+        for menu in menus:
+            await test_app.delete(f"/api/v1/menus/{menu['id']}")
+
+
+class TestCatalogImport:
+    catalog = [
+        {
+            "title": "Import menu",
+            "description": "d",
+            "submenus": [
+                {
+                    "title": f"Import submenu {i}",
+                    "description": "d",
+                    "dishes": [
+                        {"title": f"Import dish {i}.{j}", "description": "d", "price": "10.50"} for j in range(i + 1)
+                    ],
+                }
+                for i in range(3)
+            ],
+        },
+    ]
+
+    @pytest.mark.asyncio
+    async def test_import_catalog(self, test_app):
+        response = await test_app.post("/api/v1/catalog/import", json=self.catalog)
+        assert response.status_code == status.HTTP_201_CREATED
+        assert {key: response.json()[key] for key in ("menus", "submenus", "dishes")} == {
+            "menus": 1,
+            "submenus": 3,
+            "dishes": 6,
+        }
+
+        menus = (await test_app.get("/api/v1/menus")).json()
+        menu = next(menu for menu in menus if menu["title"] == "Import menu")
+        assert (menu["submenus_count"], menu["dishes_count"]) == (3, 6)
+        submenus = (await test_app.get(f"/api/v1/menus/{menu['id']}/submenus")).json()
+        assert [submenu["dishes_count"] for submenu in submenus] == [1, 2, 3]
+        dishes = (await test_app.get(f"/api/v1/menus/{menu['id']}/submenus/{submenus[2]['id']}/dishes")).json()
+        assert [dish["title"] for dish in dishes] == ["Import dish 2.0", "Import dish 2.1", "Import dish 2.2"]
+
+        # повтор названия откатывает всю загрузку
+        dish = self.catalog[0]["submenus"][0]["dishes"][0]
+        duplicate_dish = {"title": "Import submenu 3", "description": "d", "dishes": [dish]}
+        for submenus in (self.catalog[0]["submenus"][:1], [duplicate_dish]):
+            catalog = [{"title": "Import menu 2", "description": "d", "submenus": submenus}]
+            response = await test_app.post("/api/v1/catalog/import", json=catalog)
+            assert response.status_code == status.HTTP_409_CONFLICT
+        menus = (await test_app.get("/api/v1/menus")).json()
+        assert "Import menu 2" not in {menu["title"] for menu in menus}
+        await test_app.delete(f"/api/v1/menus/{menu['id']}")
+
+    @pytest.mark.asyncio
+    async def test_import_drops_cached_not_found(self, test_app, monkeypatch):
+        menu = (await test_app.post("/api/v1/menus", json={"title": "Before import", "description": "d"})).json()
+        submenu_url = f"/api/v1/menus/{menu['id']}/submenus"
+        submenu = (await test_app.post(submenu_url, json={"title": "Before import", "description": "d"})).json()
+        await test_app.delete(f"/api/v1/menus/{menu['id']}")
+        # следующие номера из последовательностей получит загрузка, их 404 уже в кеше
+        menu_url = f"/api/v1/menus/{int(menu['id']) + 1}"
+        submenu_url = f"{menu_url}/submenus/{int(submenu['id']) + 1}"
+        for url in (menu_url, submenu_url):
+            assert (await test_app.get(url)).status_code == status.HTTP_404_NOT_FOUND
+
+        # прогрев сразу упирается в бюджет времени и не перезаписывает эти ключи
+        monkeypatch.setattr(config, "CACHE_WARMUP_TIME_BUDGET", -1)
+        response = await test_app.post("/api/v1/catalog/import", json=self.catalog)
+        assert response.status_code == status.HTTP_201_CREATED
+        assert (await test_app.get(menu_url)).json()["title"] == "Import menu"
+        assert (await test_app.get(submenu_url)).json()["title"] == "Import submenu 0"
+        await test_app.delete(menu_url)
+
+    @pytest.mark.asyncio
+    async def test_import_warms_only_imported_menus(self, test_app):
+        other = (await test_app.post("/api/v1/menus", json={"title": "Not imported", "description": "d"})).json()
+        redis = await get_redis()
+        await redis.delete(f"menu_{other['id']}")
+        response = await test_app.post("/api/v1/catalog/import", json=self.catalog)
+        warmup = response.json()["cache_warmup"]
+        # 1 меню, 3 подменю, 6 блюд и первые страницы 1 списка подменю и 3 списков блюд
+        assert warmup["complete"]
+        assert warmup["keys"] == 14
+        assert not await redis.exists(f"menu_{other['id']}")
+        menus = (await test_app.get("/api/v1/menus")).json()
+        for menu in menus:
+            await test_app.delete(f"/api/v1/menus/{menu['id']}")
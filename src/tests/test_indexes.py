@@ -0,0 +1,79 @@
+from decimal import Decimal
+
+import pytest
+from sqlalchemy import select, text
+from sqlalchemy.dialects import postgresql
+
+from src.db import engine
+from src.models import Dish, SubMenu
+from src.services import CRUD
+from src.tasks.export import FULL_MENU_QUERY
+
+
+async def explain(query, *disabled: str) -> str:
+    if not isinstance(query, str):
+        query = str(query.compile(dialect=postgresql.dialect(), compile_kwargs={"literal_binds": True}))
+    async with engine.connect() as connection:
+        # на маленьких тестовых таблицах планировщик всегда выбрал бы seq scan
+        for setting in ("enable_seqscan", *disabled):
+            await connection.execute(text(f"SET {setting} = off"))
+        result = await connection.execute(text(f"EXPLAIN {query}"))
+        return "\n".join(row[0] for row in result)
+
+
+class TestIndexes:
+    @pytest.mark.asyncio
+    @pytest.mark.parametrize(("entity", "index"), [(SubMenu, "ix_submenu_owner_id"), (Dish, "ix_dish_owner_id")])
+    async def test_owner_page_uses_owner_id_index(self, entity, index):
+        query = select(entity).where(entity.id > 0).where(entity.owner == 1).order_by(entity.id).limit(101)
+        plan = await explain(query)
+        assert index in plan
+        assert "Sort" not in plan
+
+    @pytest.mark.asyncio
+    @pytest.mark.parametrize(("after_id", "after_price"), [(0, None), (5, Decimal("12.50")), (5, None)])
+    async def test_price_page_uses_owner_price_index(self, after_id, after_price):
+        where = (Dish.price >= 10, Dish.price <= 30)
+        for conditions, keys in CRUD._keyset(Dish, 1, after_id, where, Dish.price, after_price):
+            plan = await explain(select(Dish).where(*conditions).order_by(*keys).limit(101))
+            # строки с NULL в цене читаются отдельно по id, им хватает любого из двух индексов
+            assert "ix_dish_owner_price_id" in plan or len(keys) == 1
+            assert "Sort" not in plan
+
+    @pytest.mark.asyncio
+    async def test_full_menu_join_uses_owner_indexes(self):
+        # каталог с веером подменю и блюд и свежей статистикой, иначе планировщик гадает о размерах таблиц
+        async with engine.begin() as connection:
+            menu_id = (
+                await connection.execute(
+                    text("INSERT INTO menu (title, description) VALUES ('Plan menu', 'd') RETURNING id"),
+                )
+            ).scalar()
+            await connection.execute(
+                text(
+                    "INSERT INTO submenu (title, description, owner) "
+                    "SELECT 'Plan submenu ' || i, 'd', :menu_id FROM generate_series(1, 20) i",
+                ),
+                {"menu_id": menu_id},
+            )
+            await connection.execute(
+                text(
+                    "INSERT INTO dish (title, description, price, owner) "
+                    "SELECT 'Plan dish ' || submenu.id || '.' || i, 'd', 1, submenu.id "
+                    "FROM submenu, generate_series(1, 100) i WHERE submenu.owner = :menu_id",
+                ),
+                {"menu_id": menu_id},
+            )
+        async with engine.connect() as connection:
+            for table in ("menu", "submenu", "dish"):
+                await connection.execute(text(f"ANALYZE {table}"))
+        try:
+            # хеш-соединения читают таблицы целиком и индексы по owner не используют
+            plan = await explain(FULL_MENU_QUERY, "enable_hashjoin", "enable_mergejoin")
+        finally:
+            async with engine.begin() as connection:
+                await connection.execute(text("DELETE FROM menu WHERE id = :menu_id"), {"menu_id": menu_id})
+        assert "Seq Scan" not in plan
+        assert "ix_submenu_owner_id" in plan
+        # обе индексные пары блюд начинаются с owner, планировщик берет любую из них
+        assert "ix_dish_owner_id" in plan or "ix_dish_owner_price_id" in plan
@@ -1,3 +1,5 @@
+import asyncio
+
 import pytest
 from fastapi import status
 from httpx import AsyncClient
@@ -95,3 +97,83 @@ class TestMenu:
 
 
 #
+
+
+class TestMenuCreateConflict:
+    @pytest.mark.asyncio
+    async def test_concurrent_creates_with_same_title(self, test_app):
+        responses = await asyncio.gather(
+            *(test_app.post("/api/v1/menus", json={"title": "Race menu", "description": "d"}) for _ in range(5)),
+        )
+        codes = sorted(response.status_code for response in responses)
+        assert codes == [status.HTTP_201_CREATED] + [status.HTTP_409_CONFLICT] * 4
+        menu_id = next(response.json()["id"] for response in responses if response.status_code == 201)
+
+        url = f"/api/v1/menus/{menu_id}/submenus"
+        await test_app.post(url, json={"title": "Race submenu", "description": "d"})
+        response = await test_app.post(url, json={"title": "Race submenu", "description": "d"})
+        assert response.status_code == status.HTTP_409_CONFLICT
+        assert response.json() == {"detail": "failed to add submenu"}
+        response = await test_app.get(f"/api/v1/menus/{menu_id}")
+        assert response.json()["submenus_count"] == 1
+        await test_app.delete(f"/api/v1/menus/{menu_id}")
+
+
+class TestMenuPartialUpdate:
+    @pytest.mark.asyncio
+    async def test_patch_writes_only_supplied_fields(self, test_app):
+        response = await test_app.post("/api/v1/menus", json={"title": "Patch menu", "description": "old"})
+        menu_id = response.json()["id"]
+
+        response = await test_app.patch(f"/api/v1/menus/{menu_id}", json={"description": "new"})
+        assert response.status_code == status.HTTP_200_OK
+        assert (response.json()["title"], response.json()["description"]) == ("Patch menu", "new")
+        response = await test_app.patch(f"/api/v1/menus/{menu_id}", json={})
+        assert (response.json()["title"], response.json()["description"]) == ("Patch menu", "new")
+        response = await test_app.get(f"/api/v1/menus/{menu_id}")
+        assert response.json()["description"] == "new"
+
+        await test_app.delete(f"/api/v1/menus/{menu_id}")
+        response = await test_app.patch(f"/api/v1/menus/{menu_id}", json={"description": "new"})
+        assert response.status_code == status.HTTP_404_NOT_FOUND
+        assert response.json() == {"detail": "menu not found"}
+        response = await test_app.delete(f"/api/v1/menus/{menu_id}")
+        assert response.status_code == status.HTTP_404_NOT_FOUND
+
+
+class TestMenuTree:
+    @pytest.mark.asyncio
+    async def test_tree_nests_submenus_and_dishes(self, test_app):
+        response = await test_app.post("/api/v1/menus", json={"title": "Tree menu", "description": "m"})
+        menu_id = response.json()["id"]
+        response = await test_app.post(
+            f"/api/v1/menus/{menu_id}/submenus",
+            json={"title": "Tree submenu", "description": "s"},
+        )
+        submenu_id = response.json()["id"]
+        dish_url = f"/api/v1/menus/{menu_id}/submenus/{submenu_id}/dishes"
+        await test_app.post(dish_url, json={"title": "Tree dish", "description": "d", "price": "10.50"})
+
+        response = await test_app.get("/api/v1/menus/tree")
+        assert response.status_code == status.HTTP_200_OK
+        tree = {menu["id"]: menu for menu in response.json()}
+        menu = tree[menu_id]
+        assert (menu["title"], menu["submenus_count"], menu["dishes_count"]) == ("Tree menu", 1, 1)
+        [submenu] = menu["submenus"]
+        assert (submenu["id"], submenu["dishes_count"]) == (submenu_id, 1)
+        assert [dish["title"] for dish in submenu["dishes"]] == ["Tree dish"]
+
+        etag = response.headers["ETag"]
+        response = await test_app.get("/api/v1/menus/tree", headers={"If-None-Match": etag})
+        assert response.status_code == status.HTTP_304_NOT_MODIFIED
+
+        # любая запись меняет версию каталога, а с ней и ключ дерева
+        await test_app.post(dish_url, json={"title": "Tree dish 2", "description": "d", "price": "1.00"})
+        response = await test_app.get("/api/v1/menus/tree", headers={"If-None-Match": etag})
+        assert response.status_code == status.HTTP_200_OK
+        menu = {menu["id"]: menu for menu in response.json()}[menu_id]
+        assert len(menu["submenus"][0]["dishes"]) == 2
+
+        await test_app.delete(f"/api/v1/menus/{menu_id}")
+        response = await test_app.get("/api/v1/menus/tree")
+        assert menu_id not in {menu["id"] for menu in response.json()}
@@ -0,0 +1,69 @@
+import pytest
+import pytest_asyncio
+from fastapi import status
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import sessionmaker
+
+from src.core import config
+from src.db import db as db_module
+from src.db import get_redis
+
+
+class CountingSession:
+    """Stands in for the replica sessionmaker (the primary by default) and counts opened sessions."""
+
+    def __init__(self, factory: sessionmaker):
+        self.factory = factory
+        self.opened = 0
+
+    def __call__(self):
+        self.opened += 1
+        return self.factory()
+
+
+@pytest_asyncio.fixture
+async def replica(monkeypatch):
+    redis = await get_redis()
+    await redis.delete(f"{db_module.STICKY_PREFIX}127.0.0.1")
+    monkeypatch.setattr(db_module, "_replica_down_until", 0.0)
+    counting = CountingSession(db_module.async_session)
+    monkeypatch.setattr(db_module, "replica_session", counting)
+    return counting
+
+
+class TestReplicaRouting:
+    @pytest.mark.asyncio
+    async def test_uncached_reads_go_to_replica(self, test_app, replica):
+        response = await test_app.get("/api/v1/menus", params={"stream": "true"})
+        assert response.status_code == status.HTTP_200_OK
+        assert replica.opened == 1
+
+    @pytest.mark.asyncio
+    async def test_cached_reads_go_to_primary(self, test_app, replica):
+        # реплика может отставать, а кеш общий: то, что попадает в кеш, читается из основной БД
+        response = await test_app.get("/api/v1/menus/910001")
+        assert response.status_code == status.HTTP_404_NOT_FOUND
+        response = await test_app.get("/api/v1/menus")
+        assert response.status_code == status.HTTP_200_OK
+        assert replica.opened == 0
+
+    @pytest.mark.asyncio
+    async def test_reads_stick_to_primary_after_write(self, test_app, replica):
+        response = await test_app.post("/api/v1/menus", json={"title": "Replica menu", "description": "d"})
+        assert response.status_code == status.HTTP_201_CREATED
+        menu_id = response.json()["id"]
+        response = await test_app.get(f"/api/v1/menus/{menu_id}/submenus", params={"stream": "true"})
+        assert response.status_code == status.HTTP_200_OK
+        assert replica.opened == 0
+        await test_app.delete(f"/api/v1/menus/{menu_id}")
+
+    @pytest.mark.asyncio
+    async def test_unhealthy_replica_falls_back_to_primary(self, test_app, replica, dead_replica_url):
+        engine = db_module.make_engine(config.DB_ENGINE_SETTINGS, dead_replica_url, timeout=1)
+        replica.factory = sessionmaker(engine, class_=AsyncSession)
+        for _ in range(2):
+            response = await test_app.get("/api/v1/menus", params={"stream": "true"})
+            assert response.status_code == status.HTTP_200_OK
+        # после первой ошибки реплика исключена из чтения на DB_REPLICA_RETRY_SEC
+        assert replica.opened == 1
+        await engine.dispose()
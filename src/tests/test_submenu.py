@@ -119,3 +119,42 @@ class TestSubmenus:
         response = await test_app.delete(f"/api/v1/menus/{menu_id}/submenus/10000")
         assert response.status_code == status.HTTP_404_NOT_FOUND
         assert response.json() == {"detail": "submenu not found"}
+
+
+class TestSubmenuPagination:
+    @pytest.mark.asyncio
+    async def test_pages_are_scoped_to_menu(self, test_app):
+        menu_ids = []
+        for title in ("Paged menu 1", "Paged menu 2"):
+            response = await test_app.post("/api/v1/menus", json={"title": title, "description": "d"})
+            menu_ids.append(response.json()["id"])
+        paged_id, other_id = menu_ids
+        for title in ("Paged submenu 1", "Paged submenu 2", "Paged submenu 3"):
+            await test_app.post(f"/api/v1/menus/{paged_id}/submenus", json={"title": title, "description": "d"})
+        await test_app.post(f"/api/v1/menus/{other_id}/submenus", json={"title": "Other submenu", "description": "d"})
+
+        response = await test_app.get(f"/api/v1/menus/{paged_id}/submenus", params={"limit": 2})
+        assert [submenu["title"] for submenu in response.json()] == ["Paged submenu 1", "Paged submenu 2"]
+        cursor = response.headers["x-next-cursor"]
+        assert cursor == response.json()[-1]["id"]
+
+        url = f"/api/v1/menus/{paged_id}/submenus"
+        response = await test_app.get(url, params={"after_id": cursor, "limit": 2})
+        assert [submenu["title"] for submenu in response.json()] == ["Paged submenu 3"]
+        assert "x-next-cursor" not in response.headers
+
+        await test_app.post(url, json={"title": "Paged submenu 4", "description": "d"})
+        response = await test_app.get(url, params={"after_id": cursor, "limit": 2})
+        assert [submenu["title"] for submenu in response.json()] == ["Paged submenu 3", "Paged submenu 4"]
+
+        response = await test_app.get(f"/api/v1/menus/{other_id}/submenus")
+        assert [submenu["title"] for submenu in response.json()] == ["Other submenu"]
+        response = await test_app.get(url, params={"stream": "true", "limit": 1})
+        assert response.headers["content-type"] == "application/json"
+        assert [submenu["title"] for submenu in response.json()] == [f"Paged submenu {i}" for i in range(1, 5)]
+        response = await test_app.get(url, params={"stream": "true", "after_id": cursor})
+        assert [submenu["title"] for submenu in response.json()] == ["Paged submenu 3", "Paged submenu 4"]
+        response = await test_app.get(url, params={"limit": 0})
+        assert response.status_code == status.HTTP_422_UNPROCESSABLE_ENTITY
+        for menu_id in menu_ids:
+            await test_app.delete(f"/api/v1/menus/{menu_id}")
@@ -0,0 +1,61 @@
+from contextlib import closing
+
+import pytest
+from openpyxl import load_workbook
+
+from src.core import config
+from src.tasks.export import connect, make_excel_file
+from src.tasks.tasks import export_full_menu, write_xlsx
+
+
+class TestExcelExport:
+    def test_write_xlsx_streams_rows(self, tmp_path):
+        path = str(tmp_path / "menu.xlsx")
+        rows = ([i, f"Dish {i}", "", f"{i}.50"] for i in range(1, 1001))
+        assert write_xlsx(path, rows) == 1000
+        worksheet = load_workbook(path, read_only=True)["Меню"]
+        values = list(worksheet.values)
+        assert len(values) == 1000
+        assert values[0] == (1, "Dish 1", None, "1.50")
+        assert values[-1] == (1000, "Dish 1000", None, "1000.50")
+
+    def test_make_excel_file_blanks_repeated_groups(self):
+        rows = [
+            (1, "Menu 1", "m", 10, "Sub 10", "s", 100, "Dish", "d", "1.00"),
+            (1, "Menu 1", "m", 10, "Sub 10", "s", 101, "Dish 2", "d", "1.00"),
+            (1, "Menu 1", "m", 11, "Sub 11", "s", 102, "Dish 3", "d", "2.00"),
+            (2, "Menu 2", "m", 12, "Sub 12", "s", 103, "Dish 4", "d", "2.00"),
+        ]
+        assert list(make_excel_file(iter(rows))) == [
+            [1, "Menu 1", "m", 10, "Sub 10", "s", 100, "Dish", "d", "1.00"],
+            ["", "", "", "", "", "", 101, "Dish 2", "d", "1.00"],
+            ["", "", "", 11, "Sub 11", "s", 102, "Dish 3", "d", "2.00"],
+            [2, "Menu 2", "m", 12, "Sub 12", "s", 103, "Dish 4", "d", "2.00"],
+        ]
+
+    @pytest.mark.asyncio
+    async def test_export_reads_database(self, test_app, tmp_path):
+        response = await test_app.post("/api/v1/menus", json={"title": "Export menu", "description": "m"})
+        menu_id = response.json()["id"]
+        response = await test_app.post(
+            f"/api/v1/menus/{menu_id}/submenus",
+            json={"title": "Export submenu", "description": "s"},
+        )
+        url = f"/api/v1/menus/{menu_id}/submenus/{response.json()['id']}/dishes"
+        for title in ("Export dish 1", "Export dish 2"):
+            await test_app.post(url, json={"title": title, "description": "d", "price": "5"})
+
+        path = str(tmp_path / "full_menu.xlsx")
+        assert export_full_menu(path) >= 2
+        values = list(load_workbook(path, read_only=True)["Меню"].values)
+        first = next(i for i, row in enumerate(values) if row[7] == "Export dish 1")
+        assert (values[first][1], values[first][4]) == ("Export menu", "Export submenu")
+        # строки упорядочены, меню и подменю повторно не выводятся, а поля блюда - всегда
+        assert values[first + 1][:6] == (None,) * 6
+        assert values[first + 1][7:] == ("Export dish 2", "d", "5.00")
+        await test_app.delete(f"/api/v1/menus/{menu_id}")
+
+    def test_export_falls_back_to_primary(self, dead_replica_url):
+        with closing(connect()) as connection, connection.cursor() as cursor:
+            cursor.execute("SELECT current_database()")
+            assert cursor.fetchone()[0] == config.POSTGRES_DB